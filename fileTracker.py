@@ -4,30 +4,929 @@ File Tracker - A utility to monitor and track file changes in a directory
 """
 
 import os
+import json
 import time
+import socket
+import atexit
+import asyncio
+import errno
+import select
+import struct
 import logging
+import logging.handlers
 import argparse
+import cProfile
 import hashlib
+import functools
+import itertools
+import re
+import sys
+from array import array
+import sqlite3
+import queue
+import threading
+import ctypes
+import ctypes.util
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Set, Optional, Tuple
+from typing import AsyncIterator, Callable, Dict, Iterator, List, NamedTuple, Set, Optional, Tuple, Union
 
-# Configure logging
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+# Configure logging. Records go through a queue so the scan loop never
+# blocks on the log file or the terminal; a listener thread writes them out.
+_log_queue: queue.Queue = queue.Queue(-1)
+_log_listener = logging.handlers.QueueListener(
+    _log_queue,
+    logging.FileHandler("file_tracker.log"),
+    logging.StreamHandler()
+)
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("file_tracker.log"),
-        logging.StreamHandler()
-    ]
+    handlers=[logging.handlers.QueueHandler(_log_queue)]
 )
+_log_listener.start()
+atexit.register(_log_listener.stop)
+
+# Result of a change detection pass: (created, modified, deleted, moved), where
+# moved maps each new path to the path the file was moved from
+Changes = Tuple[Set[str], Set[str], Set[str], Dict[str, str]]
+
+# Per-file log lines emitted for one batch of changes before summarizing the rest
+MAX_LOGGED_EVENTS = 100
+
+# Read size used when hashing file contents
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Bytes taken from each end of a file in partial hash mode
+PARTIAL_HASH_BYTES = 64 * 1024
+
+# Supported digest algorithms
+HASH_ALGORITHMS = {
+    "md5": hashlib.md5,
+    "sha256": hashlib.sha256,
+    "blake2b": functools.partial(hashlib.blake2b, digest_size=32),
+}
+if xxhash is not None:
+    # Fast non-cryptographic hash, only available when xxhash is installed
+    HASH_ALGORITHMS["xxh3"] = xxhash.xxh3_128
+
+# Small files are grouped into one hashing task until the group reaches this size
+HASH_BATCH_BYTES = 1024 * 1024
+HASH_BATCH_FILES = 64
+
+class StateStore:
+    """
+    A persistent SQLite snapshot of tracked file states
+    """
+    
+    SCHEMA_VERSION = "2"
+    
+    def __init__(self, path: str, directory: str, hash_scheme: str):
+        """
+        Open (or create) a snapshot store
+        
+        Args:
+            path: Path to the SQLite database file
+            directory: The tracked directory the snapshot belongs to
+            hash_scheme: Name of the digest scheme the stored hashes were made with
+        """
+        self.path = path
+        self.directory = directory
+        self.hash_scheme = hash_scheme
+        # The tracker may be driven from a worker thread (see FileTracker.aevents)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+        )
+        stored_version = self._get_meta("schema_version")
+        if stored_version is not None and stored_version != self.SCHEMA_VERSION:
+            # Older layout: drop it, the next full save rebuilds the snapshot
+            self.conn.execute("DROP TABLE IF EXISTS files")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            "path TEXT PRIMARY KEY, device INTEGER, inode INTEGER, size INTEGER, "
+            "mtime_ns INTEGER, modified REAL, hash TEXT) WITHOUT ROWID"
+        )
+        self.conn.commit()
+    
+    def _get_meta(self, key: str) -> Optional[str]:
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+    
+    def _expected_meta(self) -> Dict[str, str]:
+        """Metadata that must match for a snapshot to be reused"""
+        return {
+            "schema_version": self.SCHEMA_VERSION,
+            "directory": self.directory,
+            "hash_scheme": self.hash_scheme,
+        }
+    
+    def load(self, states: "FileStateTable") -> Optional["FileStateTable"]:
+        """
+        Load the snapshot
+        
+        Args:
+            states: An empty table to load the snapshot into
+        
+        Returns:
+            The filled table, or None if there is no usable snapshot
+        """
+        for key, value in self._expected_meta().items():
+            stored = self._get_meta(key)
+            if stored is None:
+                return None
+            if stored != value:
+                logging.warning(f"Ignoring snapshot {self.path}: {key} is {stored!r}, expected {value!r}")
+                return None
+        
+        for path, device, inode, size, mtime_ns, modified, file_hash in self.conn.execute(
+                "SELECT path, device, inode, size, mtime_ns, modified, hash FROM files"):
+            states[path] = {
+                "size": size,
+                "modified": modified,
+                "mtime_ns": mtime_ns,
+                "device": device,
+                "inode": inode,
+                "hash": file_hash
+            }
+        return states
+    
+    @staticmethod
+    def _row(path: str, info: Dict) -> Tuple:
+        return (path, info["device"], info["inode"], info["size"], info["mtime_ns"], info["modified"], info["hash"])
+    
+    def save_all(self, states: "FileStateTable"):
+        """
+        Replace the snapshot with a full set of file states
+        
+        Args:
+            states: The file states to save
+        """
+        with self.conn:
+            self.conn.execute("DELETE FROM files")
+            self.conn.executemany(
+                "INSERT INTO files VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (self._row(path, info) for path, info in states.items())
+            )
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO meta VALUES (?, ?)",
+                self._expected_meta().items()
+            )
+    
+    def apply_changes(self, states: "FileStateTable", created: Set[str], modified: Set[str], deleted: Set[str]):
+        """
+        Incrementally update the snapshot after a change detection pass
+        
+        Args:
+            states: The current file states
+            created: Paths of created files
+            modified: Paths of modified files
+            deleted: Paths of deleted files
+        """
+        if not (created or modified or deleted):
+            return
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (self._row(path, states[path]) for path in created | modified)
+            )
+            self.conn.executemany(
+                "DELETE FROM files WHERE path = ?",
+                ((path,) for path in deleted)
+            )
+    
+    def close(self):
+        """Close the underlying database"""
+        self.conn.close()
+
+
+class IgnoreMatcher:
+    """
+    gitignore-style ignore patterns compiled into a single regular expression
+    
+    Supported syntax: ``*`` and ``?`` (never crossing ``/``), ``[...]`` classes,
+    ``**`` across directories, a trailing ``/`` to match directories only and a
+    leading or inner ``/`` to anchor the pattern at the tracked directory.
+    Patterns without a slash match a file or directory name at any depth.
+    """
+    
+    def __init__(self, patterns: List[str]):
+        """
+        Compile the patterns
+        
+        Args:
+            patterns: List of gitignore-style patterns
+        """
+        any_parts = []
+        dir_parts = []
+        for pattern in patterns:
+            pattern = pattern.strip()
+            if not pattern or pattern.startswith("#"):
+                continue
+            dir_only = pattern.endswith("/")
+            pattern = pattern.rstrip("/")
+            anchored = "/" in pattern
+            regex = self._translate(pattern.lstrip("/"))
+            if not anchored:
+                regex = "(?:.*/)?" + regex
+            (dir_parts if dir_only else any_parts).append(regex)
+        
+        self._any_re = self._combine(any_parts)
+        self._dir_re = self._combine(dir_parts)
+    
+    @staticmethod
+    def _combine(parts: List[str]) -> Optional["re.Pattern"]:
+        if not parts:
+            return None
+        return re.compile("(?:" + "|".join(parts) + r")\Z", re.DOTALL)
+    
+    @staticmethod
+    def _translate(pattern: str) -> str:
+        """Translate one glob pattern into a regular expression"""
+        out = []
+        i = 0
+        n = len(pattern)
+        while i < n:
+            if pattern.startswith("**/", i):
+                out.append("(?:.*/)?")
+                i += 3
+            elif pattern.startswith("**", i):
+                out.append(".*")
+                i += 2
+            elif pattern[i] == "*":
+                out.append("[^/]*")
+                i += 1
+            elif pattern[i] == "?":
+                out.append("[^/]")
+                i += 1
+            elif pattern[i] == "[" and "]" in pattern[i + 2:]:
+                end = pattern.index("]", i + 2)
+                body = pattern[i + 1:end]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                out.append("[" + body.replace("\\", "\\\\") + "]")
+                i = end + 1
+            else:
+                out.append(re.escape(pattern[i]))
+                i += 1
+        return "".join(out)
+    
+    def __bool__(self) -> bool:
+        return self._any_re is not None or self._dir_re is not None
+    
+    def matches(self, rel_path: str, is_dir: bool = False) -> bool:
+        """
+        Check a single path against the patterns (its parents are not checked)
+        
+        Args:
+            rel_path: Path relative to the tracked directory
+            is_dir: Whether the path is a directory
+            
+        Returns:
+            True if the path is ignored
+        """
+        if os.sep != "/":
+            rel_path = rel_path.replace(os.sep, "/")
+        if self._any_re is not None and self._any_re.match(rel_path):
+            return True
+        return is_dir and self._dir_re is not None and self._dir_re.match(rel_path) is not None
+
+
+class InotifyWatcher:
+    """
+    A minimal ctypes binding to the Linux inotify API
+    """
+    
+    IN_MODIFY = 0x00000002
+    IN_ATTRIB = 0x00000004
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_DELETE_SELF = 0x00000400
+    IN_MOVE_SELF = 0x00000800
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_ONLYDIR = 0x01000000
+    IN_ISDIR = 0x40000000
+    
+    WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+                  IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+    
+    _EVENT_HEADER = struct.Struct("iIII")
+    _READ_SIZE = 64 * 1024
+    
+    def __init__(self):
+        """
+        Create an inotify instance
+        
+        Raises:
+            OSError: If inotify is not available on this platform
+        """
+        libc_name = ctypes.util.find_library("c")
+        try:
+            libc = ctypes.CDLL(libc_name, use_errno=True)
+            self._inotify_init1 = libc.inotify_init1
+            self._inotify_add_watch = libc.inotify_add_watch
+            self._inotify_rm_watch = libc.inotify_rm_watch
+        except (OSError, AttributeError, TypeError) as e:
+            raise OSError(errno.ENOSYS, f"inotify is not available: {e}")
+        
+        self._inotify_init1.argtypes = [ctypes.c_int]
+        self._inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self._inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        
+        # Set once add_watch() fails because fs.inotify.max_user_watches is used up
+        self.limit_reached = False
+        self.fd = self._inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        self._poller = select.poll()
+        self._poller.register(self.fd, select.POLLIN)
+    
+    def add_watch(self, path: str) -> int:
+        """
+        Watch a directory
+        
+        Args:
+            path: Absolute path of the directory
+            
+        Returns:
+            The watch descriptor
+        """
+        wd = self._inotify_add_watch(self.fd, os.fsencode(path), self.WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), path)
+        return wd
+    
+    def remove_watch(self, wd: int):
+        """Stop watching a watch descriptor (errors are ignored)"""
+        self._inotify_rm_watch(self.fd, wd)
+    
+    def read_events(self, timeout: float) -> List[Tuple[int, int, int, str]]:
+        """
+        Wait for events and read everything that is queued
+        
+        Args:
+            timeout: Maximum time to wait for the first event, in seconds
+            
+        Returns:
+            List of (wd, mask, cookie, name) tuples
+        """
+        if not self._poller.poll(timeout * 1000):
+            return []
+        
+        events = []
+        while True:
+            try:
+                data = os.read(self.fd, self._READ_SIZE)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, cookie, length = self._EVENT_HEADER.unpack_from(data, offset)
+                offset += self._EVENT_HEADER.size
+                name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+                offset += length
+                events.append((wd, mask, cookie, name))
+        return events
+    
+    def close(self):
+        """Close the inotify instance"""
+        os.close(self.fd)
+
+
+class FileStateTable:
+    """
+    A compact table of file states
+    
+    Each file is one row spread over parallel typed arrays: an interned
+    directory id, the UTF-8 file name packed into a shared byte buffer,
+    size, mtime_ns, device, inode and a fixed-width raw digest. Rows are found by
+    path through an open-addressing index of row numbers, so no per-file
+    Python objects are kept. Deleted rows are tombstoned and compacted away
+    once they outnumber the live ones.
+    """
+    
+    _EMPTY = -1
+    _TOMBSTONE = -2
+    
+    # Row flags
+    _LIVE = 1
+    _HAS_HASH = 2
+    
+    def __init__(self, digest_size: int):
+        """
+        Create an empty table
+        
+        Args:
+            digest_size: Size in bytes of the raw digests stored per file
+        """
+        self.digest_size = digest_size
+        self.last_checked = time.time()
+        self._dirs: List[str] = []
+        self._dir_ids: Dict[str, int] = {}
+        self._names = bytearray()
+        self._name_start = array("Q")
+        self._name_len = array("H")
+        self._dir = array("I")
+        self._size = array("q")
+        self._mtime_ns = array("q")
+        self._device = array("Q")
+        self._inode = array("Q")
+        self._digests = bytearray()
+        self._flags = bytearray()
+        self._index = array("i", [self._EMPTY]) * 8
+        self._index_used = 0
+        self._live_count = 0
+    
+    def __len__(self) -> int:
+        return self._live_count
+    
+    def __contains__(self, path: str) -> bool:
+        return self.find(path) >= 0
+    
+    def __iter__(self) -> Iterator[str]:
+        for row in self.rows():
+            yield self.path(row)
+    
+    def keys(self) -> Iterator[str]:
+        return iter(self)
+    
+    def items(self) -> Iterator[Tuple[str, Dict]]:
+        for row in self.rows():
+            yield self.path(row), self._info(row)
+    
+    def get(self, path: str) -> Optional[Dict]:
+        """Get the information dictionary for a path, or None if it is not tracked"""
+        row = self.find(path)
+        return self._info(row) if row >= 0 else None
+    
+    def __getitem__(self, path: str) -> Dict:
+        row = self.find(path)
+        if row < 0:
+            raise KeyError(path)
+        return self._info(row)
+    
+    def __setitem__(self, path: str, info: Dict):
+        file_hash = info["hash"]
+        digest = bytes.fromhex(file_hash) if file_hash else None
+        row = self.find(path)
+        if row < 0:
+            self._append(path, info["size"], info["mtime_ns"], info["device"], info["inode"], digest)
+        else:
+            self._write(row, info["size"], info["mtime_ns"], info["device"], info["inode"], digest)
+    
+    def __delitem__(self, path: str):
+        slot = self._find_slot(path)
+        if slot < 0:
+            raise KeyError(path)
+        row = self._index[slot]
+        self._index[slot] = self._TOMBSTONE
+        self._flags[row] = 0
+        self._live_count -= 1
+        dead = len(self._flags) - self._live_count
+        if dead > 1024 and dead > self._live_count:
+            self._compact()
+    
+    # --- Row access -------------------------------------------------------
+    
+    def rows(self) -> Iterator[int]:
+        """Iterate over the row numbers of tracked files"""
+        flags = self._flags
+        return (row for row in range(len(flags)) if flags[row] & self._LIVE)
+    
+    def paths_under(self, directory: str) -> List[str]:
+        """
+        Get the relative paths of the files in a directory and its subdirectories
+        
+        Matching directories are found by name first, so only their rows are
+        decoded rather than every path in the table.
+        """
+        prefix = directory + os.sep
+        dir_ids = {dir_id for name, dir_id in self._dir_ids.items()
+                   if name == directory or name.startswith(prefix)}
+        if not dir_ids:
+            return []
+        flags = self._flags
+        return [self.path(row) for row, dir_id in enumerate(self._dir)
+                if dir_id in dir_ids and flags[row] & self._LIVE]
+    
+    def _name_bytes(self, row: int) -> bytes:
+        start = self._name_start[row]
+        return bytes(self._names[start:start + self._name_len[row]])
+    
+    def path(self, row: int) -> str:
+        """Get the relative path of a row"""
+        name = os.fsdecode(self._name_bytes(row))
+        directory = self._dirs[self._dir[row]]
+        return os.path.join(directory, name) if directory else name
+    
+    def digest(self, row: int) -> Optional[bytes]:
+        """Get the raw digest of a row, or None if the file could not be hashed"""
+        if not self._flags[row] & self._HAS_HASH:
+            return None
+        start = row * self.digest_size
+        return bytes(self._digests[start:start + self.digest_size])
+    
+    def _info(self, row: int) -> Dict:
+        digest = self.digest(row)
+        mtime_ns = self._mtime_ns[row]
+        return {
+            "size": self._size[row],
+            "modified": mtime_ns / 1e9,
+            "mtime_ns": mtime_ns,
+            "device": self._device[row],
+            "inode": self._inode[row],
+            "hash": digest.hex() if digest is not None else "",
+            "last_checked": self.last_checked
+        }
+    
+    def stat_matches(self, row: int, stat: os.stat_result) -> bool:
+        """Check whether a row's inode, size and mtime match a stat result"""
+        return (self._inode[row] == stat.st_ino and
+                self._size[row] == stat.st_size and
+                self._mtime_ns[row] == stat.st_mtime_ns)
+    
+    def append(self, path: str, stat: os.stat_result, digest: Optional[bytes]) -> int:
+        """
+        Add a file that is known not to be in the table yet
+        
+        Args:
+            path: Relative path of the file
+            stat: Result of os.stat for the file
+            digest: Raw digest, or None if the file could not be hashed
+            
+        Returns:
+            The new row number
+        """
+        return self._append(path, stat.st_size, stat.st_mtime_ns, stat.st_dev, stat.st_ino, digest)
+    
+    def _append(self, path: str, size: int, mtime_ns: int, device: int, inode: int,
+                digest: Optional[bytes]) -> int:
+        directory, _, name = path.rpartition(os.sep)
+        dir_id = self._dir_ids.get(directory)
+        if dir_id is None:
+            dir_id = self._dir_ids[directory] = len(self._dirs)
+            self._dirs.append(sys.intern(directory))
+        name_bytes = os.fsencode(name)
+        
+        row = len(self._flags)
+        self._name_start.append(len(self._names))
+        self._name_len.append(len(name_bytes))
+        self._names += name_bytes
+        self._dir.append(dir_id)
+        self._size.append(0)
+        self._mtime_ns.append(0)
+        self._device.append(0)
+        self._inode.append(0)
+        self._digests += bytes(self.digest_size)
+        self._flags.append(self._LIVE)
+        self._write(row, size, mtime_ns, device, inode, digest)
+        
+        self._live_count += 1
+        self._insert_index(row, hash((dir_id, name_bytes)))
+        return row
+    
+    def _write(self, row: int, size: int, mtime_ns: int, device: int, inode: int, digest: Optional[bytes]):
+        self._size[row] = size
+        self._mtime_ns[row] = mtime_ns
+        self._device[row] = device
+        self._inode[row] = inode
+        if digest is None:
+            self._flags[row] = self._LIVE
+        else:
+            if len(digest) != self.digest_size:
+                raise ValueError(f"Expected a {self.digest_size}-byte digest, got {len(digest)} bytes")
+            start = row * self.digest_size
+            self._digests[start:start + self.digest_size] = digest
+            self._flags[row] = self._LIVE | self._HAS_HASH
+    
+    def set_digest(self, row: int, digest: Optional[bytes]):
+        """Replace the digest of a row"""
+        self._write(row, self._size[row], self._mtime_ns[row], self._device[row], self._inode[row], digest)
+    
+    # --- Index ------------------------------------------------------------
+    
+    def find(self, path: str) -> int:
+        """
+        Find the row of a path
+        
+        Returns:
+            The row number, or -1 if the path is not tracked
+        """
+        slot = self._find_slot(path)
+        return self._index[slot] if slot >= 0 else -1
+    
+    def _find_slot(self, path: str) -> int:
+        directory, _, name = path.rpartition(os.sep)
+        dir_id = self._dir_ids.get(directory)
+        if dir_id is None:
+            return -1
+        return self._probe(dir_id, os.fsencode(name))
+    
+    def _probe(self, dir_id: int, name_bytes: bytes) -> int:
+        index = self._index
+        mask = len(index) - 1
+        slot = hash((dir_id, name_bytes)) & mask
+        while True:
+            row = index[slot]
+            if row == self._EMPTY:
+                return -1
+            if row >= 0 and self._dir[row] == dir_id and self._name_len[row] == len(name_bytes):
+                start = self._name_start[row]
+                if self._names[start:start + len(name_bytes)] == name_bytes:
+                    return slot
+            slot = (slot + 1) & mask
+    
+    def _insert_index(self, row: int, key_hash: int):
+        if (self._index_used + 1) * 3 > len(self._index) * 2:
+            self._rebuild_index(len(self._index) * 2)
+        index = self._index
+        mask = len(index) - 1
+        slot = key_hash & mask
+        while index[slot] != self._EMPTY:
+            slot = (slot + 1) & mask
+        index[slot] = row
+        self._index_used += 1
+    
+    def _rebuild_index(self, capacity: int):
+        # Keep the load factor around 1/3 right after a rebuild
+        while capacity < self._live_count * 3:
+            capacity *= 2
+        self._index = array("i", [self._EMPTY]) * capacity
+        self._index_used = 0
+        mask = capacity - 1
+        for row in self.rows():
+            slot = hash((self._dir[row], self._name_bytes(row))) & mask
+            while self._index[slot] != self._EMPTY:
+                slot = (slot + 1) & mask
+            self._index[slot] = row
+            self._index_used += 1
+    
+    def _compact(self):
+        """Drop tombstoned rows"""
+        fresh = FileStateTable(self.digest_size)
+        for row in self.rows():
+            fresh._append(self.path(row), self._size[row], self._mtime_ns[row], self._device[row],
+                          self._inode[row], self.digest(row))
+        fresh.last_checked = self.last_checked
+        self.__dict__.update(fresh.__dict__)
+    
+    # --- Diffing ----------------------------------------------------------
+    
+    def diff(self, current: "FileStateTable") -> Tuple[Set[str], Set[str], Set[str]]:
+        """
+        Compare this (previous) table with a newer scan in a single pass
+        
+        Every row of ``current`` is looked up in this table and the matched
+        rows are marked in a bitmap; unmarked live rows are the deletions.
+        Only changed paths are materialized.
+        
+        Args:
+            current: The newer table
+            
+        Returns:
+            Tuple of (created, modified, deleted) file sets
+        """
+        created = set()
+        modified = set()
+        seen = bytearray(len(self._flags))
+        # Map the new table's directory ids onto ours once per directory
+        dir_map = [self._dir_ids.get(directory, -1) for directory in current._dirs]
+        
+        for row in current.rows():
+            dir_id = dir_map[current._dir[row]]
+            name_bytes = current._name_bytes(row)
+            slot = self._probe(dir_id, name_bytes) if dir_id >= 0 else -1
+            if slot < 0:
+                created.add(current.path(row))
+                continue
+            old = self._index[slot]
+            seen[old] = 1
+            if (current._size[row] != self._size[old] or
+                    current._mtime_ns[row] != self._mtime_ns[old] or
+                    current.digest(row) != self.digest(old)):
+                modified.add(current.path(row))
+        
+        deleted = {self.path(row) for row in self.rows() if not seen[row]}
+        return created, modified, deleted
+    
+    # --- Accounting -------------------------------------------------------
+    
+    def nbytes(self) -> int:
+        """Approximate memory used by the table, in bytes"""
+        columns = (self._name_start, self._name_len, self._dir, self._size,
+                   self._mtime_ns, self._device, self._inode, self._index)
+        total = sum(len(column) * column.itemsize for column in columns)
+        total += len(self._names) + len(self._digests) + len(self._flags)
+        total += sys.getsizeof(self._dirs) + sys.getsizeof(self._dir_ids)
+        total += sum(sys.getsizeof(directory) for directory in self._dirs)
+        return total
+    
+    def bytes_per_file(self) -> float:
+        """Approximate memory used per tracked file, in bytes"""
+        return self.nbytes() / self._live_count if self._live_count else 0.0
+
+
+class ChangeEvent(NamedTuple):
+    """A single file change"""
+    
+    kind: str
+    path: str
+    size: Optional[int]
+    mtime_ns: Optional[int]
+    hash: Optional[str]
+    timestamp: float
+    src_path: Optional[str] = None
+    
+    def to_json(self) -> str:
+        """Serialize the event as one line of JSON"""
+        return json.dumps(self._asdict(), separators=(",", ":"))
+
+
+class EventSink:
+    """
+    Base class for destinations of change events
+    """
+    
+    def emit(self, events: List[ChangeEvent]):
+        """
+        Handle one batch of events
+        
+        Args:
+            events: The events of one change detection pass
+        """
+        raise NotImplementedError
+    
+    def flush(self):
+        """Write out anything that is buffered"""
+    
+    def close(self):
+        """Flush and release resources"""
+        self.flush()
+
+
+class JsonLinesSink(EventSink):
+    """
+    Append events to a file as JSON lines
+    
+    Writes are buffered; a timer flushes the buffer at most flush_interval
+    after the first unflushed batch, so events do not wait for the next
+    batch to reach the file.
+    """
+    
+    def __init__(self, path: str, buffer_size: int = 1024 * 1024, flush_interval: float = 1.0):
+        """
+        Open the output file
+        
+        Args:
+            path: Path of the JSON-lines file (appended to)
+            buffer_size: Size of the write buffer in bytes
+            flush_interval: Maximum time events stay buffered, in seconds
+        """
+        self.file = open(path, "a", encoding="utf-8", buffering=buffer_size)
+        self.flush_interval = flush_interval
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+    
+    def emit(self, events: List[ChangeEvent]):
+        with self._lock:
+            self.file.write("".join(event.to_json() + "\n" for event in events))
+            elapsed = time.monotonic() - self._last_flush
+            if elapsed >= self.flush_interval:
+                self._flush_locked()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.flush_interval - elapsed, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+    
+    def _flush_locked(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self.file.flush()
+        self._last_flush = time.monotonic()
+    
+    def flush(self):
+        with self._lock:
+            if not self.file.closed:
+                self._flush_locked()
+    
+    def close(self):
+        with self._lock:
+            if not self.file.closed:
+                self._flush_locked()
+                self.file.close()
+
+
+class UnixSocketSink(EventSink):
+    """
+    Stream events as JSON lines to a Unix domain socket
+    
+    Batches are handed to a writer thread through a bounded queue, so a slow
+    or stuck reader never stalls the scan loop: when the queue is full, new
+    batches are dropped and logged.
+    """
+    
+    def __init__(self, path: str, max_pending: int = 1024, send_timeout: float = 5.0):
+        """
+        Args:
+            path: Path of the listening Unix socket
+            max_pending: Maximum number of batches waiting to be sent
+            send_timeout: Time a send may block before the connection is dropped, in seconds
+        """
+        self.path = path
+        self.send_timeout = send_timeout
+        self.sock: Optional[socket.socket] = None
+        self._queue: "queue.Queue[Optional[bytes]]" = queue.Queue(max_pending)
+        self._writer: Optional[threading.Thread] = None
+        self._dropped = 0
+    
+    def _connect(self) -> socket.socket:
+        if self.sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.send_timeout)
+            try:
+                sock.connect(self.path)
+            except OSError:
+                sock.close()
+                raise
+            self.sock = sock
+        return self.sock
+    
+    def emit(self, events: List[ChangeEvent]):
+        if self._writer is None:
+            self._writer = threading.Thread(target=self._write_loop, name="UnixSocketSink", daemon=True)
+            self._writer.start()
+        payload = "".join(event.to_json() + "\n" for event in events).encode("utf-8")
+        try:
+            self._queue.put_nowait(payload)
+        except queue.Full:
+            self._dropped += 1
+            logging.error(f"Event queue for {self.path} is full, dropped {self._dropped} batch(es)")
+    
+    def _write_loop(self):
+        while True:
+            payload = self._queue.get()
+            if payload is None:
+                break
+            try:
+                self._connect().sendall(payload)
+            except OSError as e:
+                # Drop the batch and reconnect on the next one
+                logging.error(f"Error sending events to {self.path}: {e}")
+                self._disconnect()
+        self._disconnect()
+    
+    def _disconnect(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+    
+    def close(self):
+        """Send what is queued, then close the connection"""
+        if self._writer is not None:
+            self._queue.put(None)
+            self._writer.join()
+            self._writer = None
+
+
+class CallbackSink(EventSink):
+    """
+    Pass each batch of events to a function
+    """
+    
+    def __init__(self, callback: Callable[[List[ChangeEvent]], None]):
+        """
+        Args:
+            callback: Function called with each batch of events
+        """
+        self.callback = callback
+    
+    def emit(self, events: List[ChangeEvent]):
+        self.callback(events)
+
 
 class FileTracker:
     """
     A class to track file changes in a directory
     """
     
-    def __init__(self, directory: str, recursive: bool = False, ignore_patterns: list = None):
+    def __init__(self, directory: str, recursive: bool = False, ignore_patterns: list = None,
+                 state_file: Optional[str] = None, paranoid_sample: int = 0, workers: int = 1,
+                 hash_algorithm: str = "md5", partial_hash: bool = False):
         """
         Initialize the FileTracker
         
@@ -35,164 +934,782 @@ class FileTracker:
             directory: The directory to monitor
             recursive: Whether to monitor subdirectories
             ignore_patterns: List of patterns to ignore
+            state_file: Path to a snapshot database used to resume across restarts (optional)
+            paranoid_sample: Number of metadata-unchanged files to rehash each cycle
+                to catch content changes that preserved size and mtime (0 disables)
+            workers: Number of threads hashing files during a scan
+            hash_algorithm: Digest algorithm, one of HASH_ALGORITHMS
+            partial_hash: Hash only the size, head and tail of each file
+                (a quick first pass rather than a full content check)
         """
         self.directory = os.path.abspath(directory)
         self.recursive = recursive
         self.ignore_patterns = ignore_patterns or []
-        self.file_states: Dict[str, Dict] = {}
+        self.ignore_matcher = IgnoreMatcher(self.ignore_patterns)
+        self.paranoid_sample = paranoid_sample
+        self.workers = max(1, workers)
+        if hash_algorithm not in HASH_ALGORITHMS:
+            raise ValueError(f"Unknown hash algorithm '{hash_algorithm}'. "
+                             f"Choose from: {', '.join(HASH_ALGORITHMS)}")
+        self.hash_algorithm = hash_algorithm
+        self.partial_hash = partial_hash
+        self.hash_scheme = f"{hash_algorithm}+partial" if partial_hash else hash_algorithm
+        self._hash_buffers = threading.local()
+        self.file_states = self._new_table()
         self.running = False
+        self._verify_cursor = 0
         
         if not os.path.exists(self.directory):
             raise ValueError(f"Directory '{self.directory}' does not exist")
         
+        self.store = StateStore(state_file, self.directory, self.hash_scheme) if state_file else None
+        
         logging.info(f"Initializing file tracker for {self.directory}")
         logging.info(f"Recursive mode: {self.recursive}")
+        logging.info(f"Hash scheme: {self.hash_scheme}")
         if self.ignore_patterns:
             logging.info(f"Ignoring patterns: {', '.join(self.ignore_patterns)}")
+        if self.store:
+            logging.info(f"Snapshot file: {state_file}")
+        if self.paranoid_sample:
+            logging.info(f"Paranoid mode: re-verifying {self.paranoid_sample} unchanged files per cycle")
+        if self.workers > 1:
+            logging.info(f"Hashing with {self.workers} worker threads")
+    
+    def _get_buffer(self) -> memoryview:
+        """Get this thread's reusable read buffer"""
+        view = getattr(self._hash_buffers, "view", None)
+        if view is None:
+            view = self._hash_buffers.view = memoryview(bytearray(HASH_CHUNK_SIZE))
+        return view
+    
+    def _new_table(self) -> FileStateTable:
+        """Create an empty state table sized for the configured digest"""
+        return FileStateTable(HASH_ALGORITHMS[self.hash_algorithm]().digest_size)
     
     def _get_file_hash(self, file_path: str) -> str:
         """
-        Calculate MD5 hash of a file
+        Calculate the digest of a file with the configured hash scheme
         
         Args:
             file_path: Path to the file
             
         Returns:
-            MD5 hash of the file
+            Hex digest of the file, or "" if it could not be read
         """
-        hash_md5 = hashlib.md5()
+        digest = self._get_file_digest(file_path)
+        return digest.hex() if digest is not None else ""
+    
+    def _get_file_digest(self, file_path: str) -> Optional[bytes]:
+        """
+        Calculate the raw digest of a file with the configured hash scheme
+        
+        Args:
+            file_path: Path to the file
+            
+        Returns:
+            Raw digest of the file, or None if it could not be read
+        """
+        hasher = HASH_ALGORITHMS[self.hash_algorithm]()
         try:
-            with open(file_path, "rb") as f:
-                for chunk in iter(lambda: f.read(4096), b""):
-                    hash_md5.update(chunk)
-            return hash_md5.hexdigest()
+            with open(file_path, "rb", buffering=0) as f:
+                size = os.fstat(f.fileno()).st_size
+                # Always read into the reused buffer: hashing an mmap of a file
+                # truncated meanwhile (e.g. copytruncate log rotation) raises
+                # SIGBUS, which kills the process instead of raising an error
+                if self.partial_hash:
+                    self._update_partial(hasher, f, size)
+                else:
+                    self._update_from_file(hasher, f, size)
+            return hasher.digest()
         except Exception as e:
             logging.error(f"Error calculating hash for {file_path}: {e}")
-            return ""
+            return None
+    
+    def _update_from_file(self, hasher, f, limit: int):
+        """Feed up to ``limit`` bytes from the current position of ``f`` into ``hasher``"""
+        view = self._get_buffer()
+        while limit > 0:
+            n = f.readinto(view[:min(limit, len(view))])
+            if not n:
+                break
+            hasher.update(view[:n])
+            limit -= n
+    
+    def _update_partial(self, hasher, f, size: int):
+        """Feed the size, head and tail of a file into ``hasher``"""
+        hasher.update(size.to_bytes(8, "little"))
+        if size <= 2 * PARTIAL_HASH_BYTES:
+            self._update_from_file(hasher, f, size)
+            return
+        self._update_from_file(hasher, f, PARTIAL_HASH_BYTES)
+        f.seek(size - PARTIAL_HASH_BYTES)
+        self._update_from_file(hasher, f, PARTIAL_HASH_BYTES)
+    
+    @staticmethod
+    def _is_unchanged(previous: Optional[Dict], stat: os.stat_result) -> bool:
+        """Check whether a file's metadata still matches its previous state"""
+        return (previous is not None and
+                previous["inode"] == stat.st_ino and
+                previous["size"] == stat.st_size and
+                previous["mtime_ns"] == stat.st_mtime_ns)
     
-    def _get_file_info(self, file_path: str) -> Dict:
+    def _get_file_info(self, file_path: str, previous: Optional[Dict] = None,
+                       stat: Optional[os.stat_result] = None) -> Dict:
         """
         Get file information
         
         Args:
             file_path: Path to the file
+            previous: Previously recorded information for the file (optional).
+                If its inode, size and mtime still match and it has a hash,
+                the hash is reused instead of rehashing the file.
+            stat: Result of os.stat for the file, if already known (optional)
             
         Returns:
             Dictionary with file information
         """
-        stat = os.stat(file_path)
+        if stat is None:
+            stat = os.stat(file_path)
+        if self._is_unchanged(previous, stat) and previous["hash"]:
+            file_hash = previous["hash"]
+        else:
+            file_hash = self._get_file_hash(file_path)
+        return self._make_info(stat, file_hash)
+    
+    @staticmethod
+    def _make_info(stat: os.stat_result, file_hash: str) -> Dict:
+        """Build the file information dictionary from a stat result and a hash"""
         return {
             "size": stat.st_size,
             "modified": stat.st_mtime,
-            "hash": self._get_file_hash(file_path),
+            "mtime_ns": stat.st_mtime_ns,
+            "device": stat.st_dev,
+            "inode": stat.st_ino,
+            "hash": file_hash,
             "last_checked": time.time()
         }
     
-    def _should_ignore(self, path: str) -> bool:
+    def _should_ignore(self, path: str, is_dir: bool = False) -> bool:
         """
         Check if a path should be ignored
         
+        Ignored directories are pruned during walks, so only the path itself
+        is checked, not its parents.
+        
         Args:
             path: Path to check
+            is_dir: Whether the path is a directory
             
         Returns:
             True if the path should be ignored, False otherwise
         """
-        for pattern in self.ignore_patterns:
-            if pattern in path:
-                return True
-        return False
+        return self.ignore_matcher.matches(path, is_dir)
     
-    def scan_directory(self) -> Dict[str, Dict]:
+    def scan_directory(self, previous: Optional[FileStateTable] = None) -> FileStateTable:
         """
-        Scan the directory and get the current state of all files
+        Scan the directory and get the current state of all files.
+        
+        Only files that are new or whose metadata differs from ``previous``
+        are read and hashed; the rest are checked with a single stat call.
+        
+        Args:
+            previous: Previously recorded file states whose hashes may be
+                trusted for files that are unchanged on disk (optional)
         
         Returns:
-            Dictionary with file paths as keys and file information as values
+            Table of the current file states
         """
-        current_files = {}
+        current_files = self._new_table()
+        if self.workers > 1:
+            self._scan_parallel(current_files, previous)
+        else:
+            for rel_path, file_path, stat in self._iter_files():
+                row = previous.find(rel_path) if previous else -1
+                # A file whose hash failed last time (None) is retried
+                digest = previous.digest(row) if row >= 0 and previous.stat_matches(row, stat) else None
+                if digest is None:
+                    digest = self._get_file_digest(file_path)
+                current_files.append(rel_path, stat, digest)
         
-        for root, dirs, files in os.walk(self.directory):
-            # Skip directories if not recursive
-            if not self.recursive and root != self.directory:
-                continue
-                
-            for file in files:
-                file_path = os.path.join(root, file)
-                rel_path = os.path.relpath(file_path, self.directory)
-                
-                # Skip ignored files
-                if self._should_ignore(rel_path):
-                    continue
-                
-                try:
-                    current_files[rel_path] = self._get_file_info(file_path)
-                except Exception as e:
-                    logging.error(f"Error processing {file_path}: {e}")
+        if previous and self.paranoid_sample:
+            self._verify_sample(current_files, previous)
         
         return current_files
     
-    def detect_changes(self) -> Tuple[Set[str], Set[str], Set[str]]:
+    def _iter_files(self) -> Iterator[Tuple[str, str, os.stat_result]]:
+        """
+        Walk the tracked directory with os.scandir
+        
+        Yields:
+            Tuples of (relative path, absolute path, stat result) for each file
+        """
+        pending = [""]
+        while pending:
+            rel_dir = pending.pop()
+            abs_dir = os.path.join(self.directory, rel_dir)
+            try:
+                with os.scandir(abs_dir) as entries:
+                    for entry in entries:
+                        rel_path = os.path.join(rel_dir, entry.name)
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                # Non-recursive scans never descend; ignored subtrees are pruned
+                                if self.recursive and not self._should_ignore(rel_path, True):
+                                    pending.append(rel_path)
+                                continue
+                            if not entry.is_file() or self._should_ignore(rel_path):
+                                continue
+                            stat = entry.stat()
+                        except OSError as e:
+                            logging.error(f"Error processing {entry.path}: {e}")
+                            continue
+                        yield rel_path, entry.path, stat
+            except OSError as e:
+                logging.error(f"Error scanning {abs_dir}: {e}")
+    
+    def _scan_parallel(self, current_files: FileStateTable, previous: Optional[FileStateTable]):
+        """
+        Scan the directory, hashing files on a pool of worker threads
+        
+        The walk runs on the calling thread and feeds batches of files that
+        need hashing into a bounded queue, so memory stays bounded and the
+        device always has several reads outstanding.
+        
+        Args:
+            current_files: Empty table to fill with the scan result
+            previous: Previously recorded file states (optional)
+        """
+        results: List[Tuple[str, os.stat_result, Optional[bytes]]] = []
+        tasks: queue.Queue = queue.Queue(maxsize=self.workers * 4)
+        
+        def worker():
+            while True:
+                batch = tasks.get()
+                if batch is None:
+                    return
+                for rel_path, file_path, stat in batch:
+                    results.append((rel_path, stat, self._get_file_digest(file_path)))
+        
+        threads = [threading.Thread(target=worker, daemon=True) for _ in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        
+        try:
+            batch = []
+            batch_bytes = 0
+            for rel_path, file_path, stat in self._iter_files():
+                row = previous.find(rel_path) if previous else -1
+                if row >= 0 and previous.stat_matches(row, stat):
+                    digest = previous.digest(row)
+                    # A file whose hash failed last time (None) is retried
+                    if digest is not None:
+                        current_files.append(rel_path, stat, digest)
+                        continue
+                batch.append((rel_path, file_path, stat))
+                batch_bytes += stat.st_size
+                if batch_bytes >= HASH_BATCH_BYTES or len(batch) >= HASH_BATCH_FILES:
+                    tasks.put(batch)
+                    batch = []
+                    batch_bytes = 0
+            if batch:
+                tasks.put(batch)
+        finally:
+            for _ in threads:
+                tasks.put(None)
+            for thread in threads:
+                thread.join()
+        
+        for rel_path, stat, digest in results:
+            current_files.append(rel_path, stat, digest)
+    
+    def _verify_sample(self, current_files: FileStateTable, previous: FileStateTable):
+        """
+        Rehash a rotating sample of files whose hash was trusted from metadata
+        
+        Args:
+            current_files: The scan result to verify in place
+            previous: The file states the trusted hashes were taken from
+        """
+        if not current_files:
+            return
+        if self._verify_cursor >= len(current_files):
+            self._verify_cursor = 0
+        sample = list(itertools.islice(current_files.rows(), self._verify_cursor,
+                                       self._verify_cursor + self.paranoid_sample))
+        self._verify_cursor += len(sample)
+        
+        for row in sample:
+            rel_path = current_files.path(row)
+            prev_row = previous.find(rel_path)
+            trusted = current_files.digest(row)
+            if prev_row < 0 or previous.digest(prev_row) != trusted:
+                # Freshly hashed this cycle, nothing to verify
+                continue
+            actual = self._get_file_digest(os.path.join(self.directory, rel_path))
+            if actual != trusted:
+                logging.warning(f"Content of {rel_path} changed without a metadata change")
+                current_files.set_digest(row, actual)
+    
+    def detect_changes(self, with_moves: bool = False) -> Union[Tuple[Set[str], Set[str], Set[str]], Changes]:
         """
         Detect changes between the current state and the previous state
         
+        Args:
+            with_moves: Also pair deletions with creations into moves
+            
         Returns:
-            Tuple of (created, modified, deleted) file sets
+            Tuple of (created, modified, deleted) file sets; with with_moves,
+            followed by a dictionary mapping the new path of each moved file
+            to its old path (moved files are then left out of created and deleted)
         """
-        current_files = self.scan_directory()
+        changes = self._apply_scan(self.scan_directory(previous=self.file_states), with_moves)
+        return changes if with_moves else changes[:3]
+    
+    def _apply_scan(self, current_files: FileStateTable, with_moves: bool = True) -> Changes:
+        """
+        Compare a fresh scan with the previous state and make it the current state
         
-        # Find created and modified files
+        Args:
+            current_files: Result of scan_directory()
+            with_moves: Pair deletions with creations into moves
+            
+        Returns:
+            Tuple of (created, modified, deleted, moved) changes
+        """
+        created, modified, deleted = self.file_states.diff(current_files)
+        deleted_info = {rel_path: self.file_states.get(rel_path) for rel_path in deleted}
+        
+        # Update file states
+        self.file_states = current_files
+        if self.store:
+            self.store.apply_changes(self.file_states, created, modified, deleted)
+        
+        moved = self._pair_moves(created, modified, deleted, deleted_info) if with_moves else {}
+        return created, modified, deleted, moved
+    
+    def _pair_moves(self, created: Set[str], modified: Set[str], deleted: Set[str],
+                    deleted_info: Dict[str, Dict]) -> Dict[str, str]:
+        """
+        Turn matching deletion/creation pairs into moves
+        
+        A created file is matched to a deleted one by device and inode first
+        (with an unchanged mtime or hash, since inodes are reused as soon as a
+        file is deleted), then by size and content hash. Only the changed files are indexed, so
+        the cost is proportional to the number of changes. Matched paths are
+        removed from ``created`` and ``deleted``; a file whose content also
+        changed during the move is added to ``modified``.
+        
+        Args:
+            created: Paths of created files, updated in place
+            modified: Paths of modified files, updated in place
+            deleted: Paths of deleted files, updated in place
+            deleted_info: Last known information of each deleted file
+            
+        Returns:
+            Dictionary mapping the new path of each moved file to its old path
+        """
+        if not created or not deleted:
+            return {}
+        
+        by_identity = {}
+        by_content: Dict[Tuple[int, str], List[str]] = {}
+        for rel_path in deleted:
+            info = deleted_info[rel_path]
+            by_identity[(info["device"], info["inode"])] = rel_path
+            if info["hash"]:
+                by_content.setdefault((info["size"], info["hash"]), []).append(rel_path)
+        
+        moved = {}
+        for rel_path in sorted(created):
+            info = self.file_states.get(rel_path)
+            source = by_identity.get((info["device"], info["inode"]))
+            if source is not None:
+                old_info = deleted_info[source]
+                if source not in deleted or (info["mtime_ns"] != old_info["mtime_ns"] and
+                                             info["hash"] != old_info["hash"]):
+                    source = None
+            if source is None:
+                candidates = by_content.get((info["size"], info["hash"]), []) if info["hash"] else []
+                while candidates:
+                    candidate = candidates.pop()
+                    if candidate in deleted:
+                        source = candidate
+                        break
+            if source is None:
+                continue
+            
+            created.discard(rel_path)
+            deleted.discard(source)
+            moved[rel_path] = source
+            old_info = deleted_info[source]
+            if info["size"] != old_info["size"] or info["hash"] != old_info["hash"]:
+                modified.add(rel_path)
+        return moved
+    
+    @staticmethod
+    def _is_modified(info: Dict, previous: Dict) -> bool:
+        """Check whether a file's information differs from its previous state"""
+        return (info["size"] != previous["size"] or
+                info["mtime_ns"] != previous["mtime_ns"] or
+                info["hash"] != previous["hash"])
+    
+    def _watch_tree(self, watcher: InotifyWatcher, watches: Dict[int, str], rel_dir: str) -> List[str]:
+        """
+        Add inotify watches for a directory (and its subdirectories if recursive)
+        
+        Args:
+            watcher: The inotify watcher
+            watches: Mapping of watch descriptors to relative directory paths, updated in place
+            rel_dir: Directory relative to the tracked directory ("" for the root)
+            
+        Directories that cannot be watched or listed are logged and skipped.
+        If the watch limit is reached, watcher.limit_reached is set and no
+        further watches are added; the caller then falls back to polling.
+        
+        Returns:
+            Relative paths of the files found while adding the watches
+        """
+        found = []
+        pending = [rel_dir]
+        while pending:
+            current = pending.pop()
+            abs_dir = os.path.join(self.directory, current)
+            try:
+                watches[watcher.add_watch(abs_dir)] = current
+                entries = list(os.scandir(abs_dir))
+            except FileNotFoundError:
+                continue
+            except OSError as e:
+                if e.errno == errno.ENOSPC:
+                    logging.warning(f"inotify watch limit reached at {abs_dir} "
+                                    f"(see fs.inotify.max_user_watches)")
+                    watcher.limit_reached = True
+                    break
+                logging.warning(f"Cannot watch {abs_dir}: {e}")
+                continue
+            for entry in entries:
+                rel_path = os.path.join(current, entry.name)
+                if entry.is_dir(follow_symlinks=False):
+                    if self.recursive and not self._should_ignore(rel_path, True):
+                        pending.append(rel_path)
+                elif entry.is_file() and not self._should_ignore(rel_path):
+                    found.append(rel_path)
+        return found
+    
+    def _refresh_paths(self, paths: Set[str]) -> Changes:
+        """
+        Re-examine a set of files reported by inotify and update the state
+        
+        Args:
+            paths: Relative paths of files that may have changed
+            
+        Returns:
+            Tuple of (created, modified, deleted, moved) changes
+        """
         created = set()
         modified = set()
+        deleted = set()
+        deleted_info = {}
         
-        for file_path, info in current_files.items():
-            if file_path not in self.file_states:
-                created.add(file_path)
-            elif (info["size"] != self.file_states[file_path]["size"] or 
-                  info["modified"] != self.file_states[file_path]["modified"] or
-                  info["hash"] != self.file_states[file_path]["hash"]):
-                modified.add(file_path)
+        for rel_path in paths:
+            previous = self.file_states.get(rel_path)
+            file_path = os.path.join(self.directory, rel_path)
+            try:
+                if not os.path.isfile(file_path):
+                    raise FileNotFoundError(file_path)
+                info = self._get_file_info(file_path, previous)
+            except FileNotFoundError:
+                if previous is not None:
+                    del self.file_states[rel_path]
+                    deleted.add(rel_path)
+                    deleted_info[rel_path] = previous
+                continue
+            except Exception as e:
+                logging.error(f"Error processing {file_path}: {e}")
+                continue
+            
+            self.file_states[rel_path] = info
+            if previous is None:
+                created.add(rel_path)
+            elif self._is_modified(info, previous):
+                modified.add(rel_path)
         
-        # Find deleted files
-        deleted = set(self.file_states.keys()) - set(current_files.keys())
+        if self.store:
+            self.store.apply_changes(self.file_states, created, modified, deleted)
+        moved = self._pair_moves(created, modified, deleted, deleted_info)
+        return created, modified, deleted, moved
+    
+    def _track_inotify(self, watcher: InotifyWatcher, watches: Dict[int, str],
+                       latency: float, interval: int) -> Iterator[Changes]:
+        """
+        Maintain the file states from inotify events until tracking stops
         
-        # Update file states
-        self.file_states = current_files
+        If the inotify watch limit is reached while new directories are
+        watched, the tree is rescanned and tracking continues by polling.
         
-        return created, modified, deleted
+        Args:
+            watcher: The inotify watcher, already watching the tree
+            watches: Mapping of watch descriptors to relative directory paths
+            latency: Time to keep collecting events after the first one, in seconds
+            interval: Interval in seconds between checks after falling back to polling
+            
+        Yields:
+            Tuples of (created, modified, deleted, moved) changes
+        """
+        while self.running:
+            events = watcher.read_events(timeout=1.0)
+            if not events:
+                continue
+            # Coalesce a burst of events (e.g. many writes to the same file)
+            time.sleep(latency)
+            events.extend(watcher.read_events(timeout=0))
+            
+            dirty = set()
+            overflow = False
+            for wd, mask, cookie, name in events:
+                if mask & InotifyWatcher.IN_Q_OVERFLOW:
+                    overflow = True
+                    break
+                if mask & InotifyWatcher.IN_IGNORED:
+                    watches.pop(wd, None)
+                    continue
+                rel_dir = watches.get(wd)
+                if rel_dir is None or not name:
+                    continue
+                rel_path = os.path.join(rel_dir, name)
+                if self._should_ignore(rel_path, bool(mask & InotifyWatcher.IN_ISDIR)):
+                    continue
+                
+                if mask & InotifyWatcher.IN_ISDIR:
+                    if not self.recursive:
+                        continue
+                    if mask & (InotifyWatcher.IN_CREATE | InotifyWatcher.IN_MOVED_TO):
+                        dirty.update(self._watch_tree(watcher, watches, rel_path))
+                    elif mask & InotifyWatcher.IN_MOVED_FROM:
+                        # Files moved out with the directory get no events of their own
+                        prefix = rel_path + os.sep
+                        dirty.update(self.file_states.paths_under(rel_path))
+                        for stale_wd in [w for w, d in watches.items() if d == rel_path or d.startswith(prefix)]:
+                            watcher.remove_watch(stale_wd)
+                            del watches[stale_wd]
+                    # A deleted directory was already empty: its files were reported
+                    # through its own watch, which inotify removes (IN_IGNORED)
+                else:
+                    dirty.add(rel_path)
+            
+            if overflow:
+                # The kernel dropped events: rebuild the watches and fall back to a full scan
+                logging.warning("inotify event queue overflowed, rescanning")
+                for wd in list(watches):
+                    watcher.remove_watch(wd)
+                watches.clear()
+                self._watch_tree(watcher, watches, "")
+            if watcher.limit_reached:
+                # Part of the tree is unwatched: rescan, then poll from now on
+                logging.warning("Falling back to polling")
+                for wd in list(watches):
+                    watcher.remove_watch(wd)
+                watches.clear()
+                yield self.detect_changes(with_moves=True)
+                yield from self._track_polling(interval)
+                return
+            if overflow:
+                yield self.detect_changes(with_moves=True)
+            else:
+                yield self._refresh_paths(dirty)
+    
+    def _make_events(self, created: Set[str], modified: Set[str], deleted: Set[str],
+                     moved: Dict[str, str]) -> List[ChangeEvent]:
+        """Turn the result of a change detection pass into change events"""
+        now = time.time()
+        events = []
+        for rel_path, source in moved.items():
+            info = self.file_states.get(rel_path)
+            events.append(ChangeEvent("moved", rel_path, info["size"], info["mtime_ns"], info["hash"], now, source))
+        for kind, paths in (("created", created), ("modified", modified)):
+            for rel_path in paths:
+                info = self.file_states.get(rel_path)
+                events.append(ChangeEvent(kind, rel_path, info["size"], info["mtime_ns"], info["hash"], now))
+        for rel_path in deleted:
+            events.append(ChangeEvent("deleted", rel_path, None, None, None, now))
+        return events
     
-    def start_tracking(self, interval: int = 5):
+    def events(self, interval: int = 5, backend: str = "poll", latency: float = 0.1,
+               profile_dir: Optional[str] = None) -> Iterator[List[ChangeEvent]]:
         """
-        Start tracking file changes
+        Track file changes and yield them in batches
+        
+        The initial scan (or the resume from a snapshot) happens on the first
+        call to next(). Each non-empty change detection pass is yielded as one
+        batch; the generator runs until stop_tracking() is called or it is closed.
         
         Args:
-            interval: Interval in seconds between checks
+            interval: Interval in seconds between checks (polling backend)
+            backend: "poll" to rescan every interval, or "inotify" to react to
+                kernel events (falls back to polling if inotify is unavailable)
+            latency: Time to coalesce a burst of inotify events, in seconds
+            profile_dir: Directory to write cProfile stats of every cycle to (optional)
+            
+        Yields:
+            Lists of change events
         """
         self.running = True
-        self.file_states = self.scan_directory()
-        logging.info(f"Initial scan complete. Found {len(self.file_states)} files.")
+        
+        watcher = None
+        watches: Dict[int, str] = {}
+        if backend == "inotify":
+            # Watch before the initial scan so no change can slip in between
+            try:
+                watcher = InotifyWatcher()
+                self._watch_tree(watcher, watches, "")
+                if watcher.limit_reached:
+                    raise OSError(errno.ENOSPC, "watch limit reached")
+                logging.info(f"Using inotify backend with {len(watches)} watches")
+            except OSError as e:
+                logging.warning(f"inotify unavailable ({e}), falling back to polling")
+                if watcher:
+                    watcher.close()
+                watcher = None
         
         try:
-            while self.running:
-                time.sleep(interval)
-                created, modified, deleted = self.detect_changes()
-                
-                # Log changes
-                for file_path in created:
-                    logging.info(f"Created: {file_path}")
-                
-                for file_path in modified:
-                    logging.info(f"Modified: {file_path}")
-                
-                for file_path in deleted:
-                    logging.info(f"Deleted: {file_path}")
-                
-                if created or modified or deleted:
-                    logging.info(f"Summary: {len(created)} created, {len(modified)} modified, {len(deleted)} deleted")
+            snapshot = self.store.load(self._new_table()) if self.store else None
+            
+            if snapshot is not None:
+                # Resume from the snapshot: unchanged files are trusted without
+                # rehashing and anything that changed while we were down is reported
+                self.file_states = snapshot
+                logging.info(f"Loaded snapshot with {len(snapshot)} files.")
+                changes = self._apply_scan(self.scan_directory(previous=snapshot))
+            else:
+                self.file_states = self.scan_directory()
+                if self.store:
+                    self.store.save_all(self.file_states)
+                changes = (set(), set(), set(), {})
+            logging.info(f"Initial scan complete. Found {len(self.file_states)} files.")
+            logging.info(f"State table uses {self.file_states.bytes_per_file():.1f} bytes per file")
+            
+            if watcher:
+                passes = self._track_inotify(watcher, watches, latency, interval)
+            else:
+                passes = self._track_polling(interval)
+            if profile_dir:
+                passes = self._profile_cycles(passes, profile_dir)
+            for changes in itertools.chain([changes], passes):
+                if any(changes):
+                    yield self._make_events(*changes)
+        finally:
+            self.running = False
+            if watcher:
+                watcher.close()
+            if self.store:
+                self.store.close()
+    
+    @staticmethod
+    def _profile_cycles(passes: Iterator[Changes], profile_dir: str) -> Iterator[Changes]:
+        """
+        Run each detection cycle under cProfile and dump its stats
+        
+        Args:
+            passes: Iterator producing one change detection pass per cycle
+            profile_dir: Directory receiving one cycle-NNNNNN.prof file per cycle
+            
+        Yields:
+            The passes, unchanged
+        """
+        os.makedirs(profile_dir, exist_ok=True)
+        for cycle in itertools.count(1):
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                changes = next(passes, None)
+            finally:
+                profiler.disable()
+            stats_path = os.path.join(profile_dir, f"cycle-{cycle:06d}.prof")
+            profiler.dump_stats(stats_path)
+            logging.debug(f"Wrote profile of cycle {cycle} to {stats_path}")
+            if changes is None:
+                return
+            yield changes
+    
+    async def aevents(self, interval: int = 5, backend: str = "poll",
+                      latency: float = 0.1) -> AsyncIterator[List[ChangeEvent]]:
+        """
+        Asynchronous version of events(); scanning runs in a worker thread
+        
+        Args:
+            interval: Interval in seconds between checks (polling backend)
+            backend: "poll" or "inotify"
+            latency: Time to coalesce a burst of inotify events, in seconds
+            
+        Yields:
+            Lists of change events
+        """
+        batches = self.events(interval, backend, latency)
+        done = object()
+        try:
+            while True:
+                batch = await asyncio.to_thread(next, batches, done)
+                if batch is done:
+                    return
+                yield batch
+        finally:
+            self.running = False
+            await asyncio.to_thread(batches.close)
+    
+    def _track_polling(self, interval: int) -> Iterator[Changes]:
+        """
+        Rescan the directory every interval until tracking stops
+        
+        Yields:
+            Tuples of (created, modified, deleted, moved) changes
+        """
+        while self.running:
+            time.sleep(interval)
+            yield self.detect_changes(with_moves=True)
+    
+    def start_tracking(self, interval: int = 5, backend: str = "poll", latency: float = 0.1,
+                       sinks: Optional[List[EventSink]] = None, profile_dir: Optional[str] = None):
+        """
+        Start tracking file changes
+        
+        Args:
+            interval: Interval in seconds between checks (polling backend)
+            backend: "poll" to rescan every interval, or "inotify" to react to
+                kernel events (falls back to polling if inotify is unavailable)
+            latency: Time to coalesce a burst of inotify events, in seconds
+            sinks: Destinations that receive every batch of change events (optional)
+            profile_dir: Directory to write cProfile stats of every cycle to (optional)
+        """
+        sinks = sinks or []
+        try:
+            for batch in self.events(interval, backend, latency, profile_dir):
+                self._log_changes(batch)
+                for sink in sinks:
+                    sink.emit(batch)
                 
         except KeyboardInterrupt:
             logging.info("Tracking stopped by user")
             self.running = False
+        finally:
+            for sink in sinks:
+                sink.close()
+    
+    def _log_changes(self, events: List[ChangeEvent]):
+        """Log a batch of change events"""
+        for event in events[:MAX_LOGGED_EVENTS]:
+            if event.kind == "moved":
+                logging.info(f"Moved: {event.src_path} -> {event.path}")
+            else:
+                logging.info(f"{event.kind.capitalize()}: {event.path}")
+        if len(events) > MAX_LOGGED_EVENTS:
+            logging.info(f"... and {len(events) - MAX_LOGGED_EVENTS} more")
+        
+        counts = {"created": 0, "modified": 0, "deleted": 0, "moved": 0}
+        for event in events:
+            counts[event.kind] += 1
+        logging.info(f"Summary: {counts['created']} created, {counts['modified']} modified, "
+                     f"{counts['deleted']} deleted, {counts['moved']} moved")
     
     def stop_tracking(self):
         """Stop tracking file changes"""
@@ -206,15 +1723,35 @@ def main():
     parser.add_argument("directory", help="Directory to monitor")
     parser.add_argument("-r", "--recursive", action="store_true", help="Monitor subdirectories")
     parser.add_argument("-i", "--interval", type=int, default=5, help="Check interval in seconds")
-    parser.add_argument("--ignore", nargs="+", default=[], help="Patterns to ignore")
+    parser.add_argument("--ignore", nargs="+", default=[],
+                        help="gitignore-style patterns to ignore (e.g. '*.log' 'node_modules/' '/build')")
+    parser.add_argument("--state-file", help="SQLite snapshot used to resume without rehashing after a restart")
+    parser.add_argument("--paranoid", type=int, default=0, metavar="N",
+                        help="Rehash N metadata-unchanged files per cycle to catch silent content changes")
+    parser.add_argument("--backend", choices=["poll", "inotify"], default="poll",
+                        help="Change detection backend (inotify is Linux only)")
+    parser.add_argument("--workers", type=int, default=1, help="Number of threads hashing files during scans")
+    parser.add_argument("--hash", choices=sorted(HASH_ALGORITHMS), default="md5", help="Digest algorithm")
+    parser.add_argument("--partial-hash", action="store_true",
+                        help="Hash only the size, head and tail of each file (fast, less thorough)")
+    parser.add_argument("--jsonl", help="Append change events to this JSON-lines file")
+    parser.add_argument("--socket", help="Stream change events as JSON lines to this Unix socket")
+    parser.add_argument("--profile", metavar="DIR",
+                        help="Dump cProfile stats of every cycle into DIR (view with python -m pstats)")
     
     args = parser.parse_args()
     
     try:
-        tracker = FileTracker(args.directory, args.recursive, args.ignore)
+        tracker = FileTracker(args.directory, args.recursive, args.ignore, args.state_file, args.paranoid,
+                              args.workers, args.hash, args.partial_hash)
         print(f"Starting file tracker for {args.directory}")
         print(f"Press Ctrl+C to stop tracking")
-        tracker.start_tracking(args.interval)
+        sinks = []
+        if args.jsonl:
+            sinks.append(JsonLinesSink(args.jsonl))
+        if args.socket:
+            sinks.append(UnixSocketSink(args.socket))
+        tracker.start_tracking(args.interval, args.backend, sinks=sinks, profile_dir=args.profile)
     except ValueError as e:
         print(f"Error: {e}")
     except Exception as e:
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+File Tracker Benchmark - Measure how FileTracker scans scale on synthetic trees
+
+Builds a temporary directory tree of configurable shape, then times the
+initial scan, a steady-state poll (nothing changed) and a high-churn poll,
+and prints the results as JSON.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import resource
+import tempfile
+from typing import Dict, List
+
+import fileTracker
+from fileTracker import FileTracker
+
+
+def read_proc_io() -> Dict[str, int]:
+    """
+    Read this process' I/O counters from /proc/self/io (Linux only)
+
+    Returns:
+        Dictionary of counters (rchar, syscr, ...), empty if unavailable
+    """
+    try:
+        with open("/proc/self/io") as f:
+            return {key: int(value) for key, value in (line.split(":") for line in f)}
+    except OSError:
+        return {}
+
+
+def peak_rss_bytes() -> int:
+    """Peak resident set size of this process so far, in bytes"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def random_size(rng: random.Random, distribution: str) -> int:
+    """
+    Draw a file size
+
+    Args:
+        rng: Random number generator
+        distribution: "small" (<= 4 KiB), "mixed" (log-normal, median ~8 KiB)
+            or "large" (1-16 MiB)
+    """
+    if distribution == "small":
+        return rng.randint(0, 4096)
+    if distribution == "large":
+        return rng.randint(1 << 20, 16 << 20)
+    return min(int(rng.lognormvariate(9, 2)), 64 << 20)
+
+
+def build_tree(root: str, files: int, depth: int, fanout: int, distribution: str,
+               rng: random.Random) -> List[str]:
+    """
+    Create a synthetic directory tree
+
+    Args:
+        root: Directory to build the tree in
+        files: Number of files
+        depth: Depth of the directory tree
+        fanout: Number of subdirectories per directory
+        distribution: File size distribution (see random_size)
+        rng: Random number generator
+
+    Returns:
+        Paths of the created files
+    """
+    directories = [root]
+    level = [root]
+    for _ in range(depth):
+        level = [os.path.join(parent, f"d{i}") for parent in level for i in range(fanout)]
+        directories.extend(level)
+    for directory in directories:
+        os.makedirs(directory, exist_ok=True)
+
+    paths = []
+    for i in range(files):
+        path = os.path.join(rng.choice(directories), f"f{i}.dat")
+        with open(path, "wb") as f:
+            f.write(rng.randbytes(random_size(rng, distribution)))
+        paths.append(path)
+    return paths
+
+
+def apply_churn(paths: List[str], churn: float, distribution: str, rng: random.Random) -> Dict[str, int]:
+    """
+    Modify, delete, create and rename a fraction of the files
+
+    Args:
+        paths: Paths of the existing files, updated in place
+        churn: Fraction of files touched, split evenly across the four operations
+        distribution: File size distribution for rewritten and new files
+        rng: Random number generator
+
+    Returns:
+        Number of files per operation
+    """
+    touched = rng.sample(range(len(paths)), int(len(paths) * churn))
+    counts = {"modified": 0, "deleted": 0, "created": 0, "moved": 0}
+    for n, index in enumerate(touched):
+        path = paths[index]
+        operation = ("modified", "deleted", "created", "moved")[n % 4]
+        if operation == "modified":
+            with open(path, "wb") as f:
+                f.write(rng.randbytes(random_size(rng, distribution)))
+        elif operation == "deleted":
+            os.remove(path)
+            paths[index] = None
+        elif operation == "created":
+            new_path = path + ".new"
+            with open(new_path, "wb") as f:
+                f.write(rng.randbytes(random_size(rng, distribution)))
+            paths.append(new_path)
+        else:
+            new_path = path + ".moved"
+            os.rename(path, new_path)
+            paths[index] = new_path
+        counts[operation] += 1
+    paths[:] = [path for path in paths if path is not None]
+    return counts
+
+
+def measure(name: str, tracker: FileTracker, action) -> Dict:
+    """
+    Run one benchmark phase and collect its metrics
+
+    Args:
+        name: Name of the phase
+        tracker: The tracker being measured
+        action: Function running the phase
+
+    Returns:
+        Dictionary of metrics
+    """
+    hashed = {"files": 0}
+    original = tracker._get_file_digest
+
+    def counting_digest(file_path):
+        hashed["files"] += 1
+        return original(file_path)
+
+    tracker._get_file_digest = counting_digest
+    io_before = read_proc_io()
+    start = time.perf_counter()
+    try:
+        result = action()
+    finally:
+        elapsed = time.perf_counter() - start
+        io_after = read_proc_io()
+        del tracker._get_file_digest
+
+    files = len(tracker.file_states)
+    metrics = {
+        "phase": name,
+        "seconds": round(elapsed, 6),
+        "files": files,
+        "files_per_sec": round(files / elapsed, 1) if elapsed else None,
+        "files_hashed": hashed["files"],
+        "peak_rss_bytes": peak_rss_bytes(),
+        "state_bytes_per_file": round(tracker.file_states.bytes_per_file(), 1),
+    }
+    if io_before and io_after:
+        # syscr only counts read-family syscalls; stat and getdents are not included
+        metrics["bytes_read"] = io_after["rchar"] - io_before["rchar"]
+        metrics["read_syscalls"] = io_after["syscr"] - io_before["syscr"]
+        metrics["read_syscalls_per_file"] = round(metrics["read_syscalls"] / files, 3) if files else None
+    if result is not None:
+        created, modified, deleted, moved = result
+        metrics["detected"] = {"created": len(created), "modified": len(modified),
+                               "deleted": len(deleted), "moved": len(moved)}
+    return metrics
+
+
+def run_benchmark(args) -> Dict:
+    """Build the tree, run every phase and return the report"""
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory(prefix="file_tracker_bench_", dir=args.tmpdir) as root:
+        start = time.perf_counter()
+        paths = build_tree(root, args.files, args.depth, args.fanout, args.sizes, rng)
+        build_seconds = time.perf_counter() - start
+
+        tracker = FileTracker(root, recursive=True, workers=args.workers,
+                              hash_algorithm=args.hash, partial_hash=args.partial_hash)
+
+        def initial_scan():
+            tracker.file_states = tracker.scan_directory()
+
+        def poll():
+            return tracker.detect_changes(with_moves=True)
+
+        phases = [measure("initial_scan", tracker, initial_scan),
+                  measure("steady_state_poll", tracker, poll)]
+        churn = apply_churn(paths, args.churn, args.sizes, rng)
+        phases.append(measure("high_churn_poll", tracker, poll))
+        phases[-1]["applied"] = churn
+
+    return {
+        "config": {
+            "files": args.files,
+            "depth": args.depth,
+            "fanout": args.fanout,
+            "sizes": args.sizes,
+            "churn": args.churn,
+            "workers": args.workers,
+            "hash": args.hash,
+            "partial_hash": args.partial_hash,
+            "seed": args.seed,
+        },
+        "python": sys.version.split()[0],
+        "build_seconds": round(build_seconds, 3),
+        "phases": phases,
+    }
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Benchmark FileTracker scans on a synthetic tree")
+    parser.add_argument("--files", type=int, default=10000, help="Number of files")
+    parser.add_argument("--depth", type=int, default=3, help="Depth of the directory tree")
+    parser.add_argument("--fanout", type=int, default=4, help="Subdirectories per directory")
+    parser.add_argument("--sizes", choices=["small", "mixed", "large"], default="small",
+                        help="File size distribution")
+    parser.add_argument("--churn", type=float, default=0.1, help="Fraction of files changed before the churn poll")
+    parser.add_argument("--workers", type=int, default=1, help="Hashing threads")
+    parser.add_argument("--hash", choices=sorted(fileTracker.HASH_ALGORITHMS), default="md5",
+                        help="Digest algorithm")
+    parser.add_argument("--partial-hash", action="store_true", help="Use partial hashing")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the tree")
+    parser.add_argument("--tmpdir", help="Where to build the tree (default: system temp dir)")
+    parser.add_argument("-o", "--output", help="Write the JSON report to this file instead of stdout")
+
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    report = run_benchmark(args)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
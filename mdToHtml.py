@@ -3,212 +3,707 @@
 Markdown to HTML Converter - A simple utility to convert Markdown files to HTML
 """
 
+import os
+import io
 import re
 import sys
+import glob
+import json
+import time
+import sqlite3
+import hashlib
 import argparse
+import signal
+import socket
+import threading
+import socketserver
+from functools import partial
+from html import escape as html_escape
+from urllib.parse import quote, urlsplit
+from concurrent.futures import ProcessPoolExecutor
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
+from mdToHtmlClient import default_socket_path
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+
+class Heading(NamedTuple):
+    """A header line (h1 to h6)"""
+    level: int
+    text: str
+
+
+class CodeBlock(NamedTuple):
+    """A fenced code block"""
+    language: str
+    code: str
+
+
+class ListBlock(NamedTuple):
+    """A run of consecutive list items of the same kind"""
+    ordered: bool
+    items: Tuple[str, ...]
+
+
+class Blockquote(NamedTuple):
+    """A run of consecutive quoted lines, grouped into paragraphs"""
+    paragraphs: Tuple[str, ...]
+
+
+class TableHead(NamedTuple):
+    """The header row of a pipe table, with each column's alignment (None, 'left', 'center' or 'right')"""
+    header: Tuple[str, ...]
+    alignments: Tuple[Optional[str], ...]
+
+
+class TableRow(NamedTuple):
+    """One body row of a pipe table, padded or truncated to the header's width"""
+    cells: Tuple[str, ...]
+    alignments: Tuple[Optional[str], ...]
+
+
+class TableEnd(NamedTuple):
+    """The end of a pipe table"""
+
+
+class HorizontalRule(NamedTuple):
+    """A horizontal rule"""
+
+
+class Paragraph(NamedTuple):
+    """Consecutive plain text lines"""
+    text: str
+
+
+# Splits table cells on pipes that are not escaped with a backslash
+TABLE_CELL_SPLIT = re.compile(r'(?<!\\)\|')
+
+# First characters (after indentation) that can start something other than a paragraph
+BLOCK_MARKERS = frozenset('`#-*_+>|0123456789')
+
+class _Delimiter:
+    """An entry on the inline scanner's delimiter stack: a link bracket or an asterisk run"""
+    
+    __slots__ = ('char', 'index', 'count', 'can_open', 'can_close', 'opens', 'closes')
+    
+    def __init__(self, char, index, count, can_open, can_close):
+        self.char = char
+        self.index = index
+        self.count = count
+        self.can_open = can_open
+        self.can_close = can_close
+        self.opens = []
+        self.closes = []
+
+
+# Attributes added to table cells for each column alignment
+ALIGN_STYLES = {
+    None: '',
+    'left': ' style="text-align: left"',
+    'center': ' style="text-align: center"',
+    'right': ' style="text-align: right"',
+}
+
+# Any node produced by MarkdownConverter.parse()
+# Tables are emitted row by row (TableHead, TableRow..., TableEnd) so that
+# arbitrarily long tables are streamed rather than held in memory
+Block = Union[Heading, CodeBlock, ListBlock, Blockquote, TableHead, TableRow, TableEnd,
+              HorizontalRule, Paragraph]
+
+# HTML document template, split around the body so it can be streamed
+HTML_HEAD = """<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="UTF-8">
+    <title>{title}</title>
+    <style>
+        body {{ font-family: Arial, sans-serif; line-height: 1.6; padding: 20px; max-width: 800px; margin: 0 auto; }}
+        code {{ background-color: #f4f4f4; padding: 2px 4px; border-radius: 3px; }}
+        pre {{ background-color: #f4f4f4; padding: 10px; border-radius: 5px; overflow-x: auto; }}
+        blockquote {{ border-left: 4px solid #ddd; padding-left: 10px; color: #666; }}
+        img {{ max-width: 100%; }}
+        table {{ border-collapse: collapse; width: 100%; }}
+        th, td {{ border: 1px solid #ddd; padding: 8px; }}
+        th {{ background-color: #f2f2f2; }}
+    </style>
+</head>
+<body>
+"""
+
+HTML_TAIL = """
+</body>
+</html>"""
+
+# Bump whenever parsing or rendering changes, so build caches are invalidated
+CONVERTER_VERSION = "9"
+
+# Outputs depend on the document template as well as the converter
+TEMPLATE_HASH = hashlib.blake2b((HTML_HEAD + HTML_TAIL).encode('utf-8'), digest_size=16).hexdigest()
+
+
+def escape_text(text: str) -> str:
+    """Escape &, < and > in HTML text content"""
+    # The membership tests are much cheaper than the replacements, and most text needs none
+    if '&' in text or '<' in text or '>' in text:
+        return html_escape(text, quote=False)
+    return text
+
+
+def escape_attribute(value: str) -> str:
+    """Escape a value for use inside a double-quoted HTML attribute"""
+    return html_escape(value, quote=True)
+
+
+def _escape_quotes(value: str) -> str:
+    """Finish escaping an attribute value whose text was already passed through escape_text()"""
+    return value.replace('"', '&quot;') if '"' in value else value
+
+
+class HtmlWriter:
+    """
+    Output buffer shared by the block renderers
+    
+    Fragments are collected in a list and joined once in getvalue(), so
+    building a long document never re-copies what was already written.
+    """
+    
+    __slots__ = ('parts', 'write')
+    
+    def __init__(self):
+        self.parts = []
+        self.write = self.parts.append
+    
+    def getvalue(self) -> str:
+        """The HTML written so far"""
+        return ''.join(self.parts)
+
+
+def normalize_newlines(text: str) -> str:
+    """
+    Turn \r\n and lone \r line endings into \n
+    
+    Files are read with universal newlines, so this makes in-memory text
+    split into the same lines as a file. Other characters that
+    str.splitlines() treats as line breaks (form feed, U+2028, ...) are
+    left as content.
+    """
+    if '\r' in text:
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    return text
+
+
+def source_digest(data: bytes) -> str:
+    """Content digest of a Markdown source, as recorded in the build manifest"""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
 
 
 class MarkdownConverter:
     """
     A class to convert Markdown to HTML
+    
+    Conversion runs in two steps: the input lines are tokenized once into a
+    sequence of block nodes (headers, lists, tables, ...), then each block is
+    rendered to HTML, with inline formatting applied to that block's text only.
     """
     
-    def __init__(self):
-        """Initialize the converter with regex patterns for Markdown elements"""
+    def __init__(self, fragment_cache=None):
+        """
+        Initialize the converter with regex patterns for Markdown elements
+        
+        Args:
+            fragment_cache: FragmentCache reused across runs for rendered blocks (optional)
+        """
+        self.fragment_cache = fragment_cache
+        
         # Regex patterns for Markdown elements
         self.patterns = {
             # Headers (h1 to h6)
-            'headers': re.compile(r'^(#{1,6})\s+(.+)$', re.MULTILINE),
+            'headers': re.compile(r'^(#{1,6})\s+(.+)$'),
             
-            # Bold text
-            'bold': re.compile(r'\*\*(.+?)\*\*'),
+            # Opening line of a fenced code block, with optional language
+            'code_fence': re.compile(r'^```(\w*)\s*$'),
             
-            # Italic text
-            'italic': re.compile(r'\*(.+?)\*'),
+            # Inline spans, recognized in one left-to-right pass: code spans
+            # (opening backtick runs; the closing run is found with str.find),
+            # images, then links and emphasis. Links and emphasis with no other
+            # markup inside are matched whole; anything else leaves link
+            # brackets and asterisk runs for the delimiter stack. URLs cannot
+            # contain parentheses, so a failed URL scan stops at the next
+            # opener. The leading lookahead lets the scanner skip plain text
+            # without trying every alternative
+            'inline': re.compile(
+                r'(?=[`!\[\]*])(?:'
+                r'(?P<ticks>`+)'
+                r'|!\[(?P<alt>[^\[\]]*)\]\((?P<src>[^()\s]*)\)'
+                r'|\[(?P<label>[^\[\]*`]+)\]\((?P<url>[^()\s]*)\)'
+                r'|\*\*\*(?=[^\s*])(?P<both>[^*`\[\]]+?)(?<=\S)\*\*\*(?!\*)'
+                r'|\*\*(?=[^\s*])(?P<strong>[^*`\[\]]+?)(?<=\S)\*\*(?!\*)'
+                r'|\*(?=[^\s*])(?P<em>[^*`\[\]]+?)(?<=\S)\*(?!\*)'
+                r'|(?P<open>\[)'
+                r'|\]\((?P<href>[^()\s]*)\)'
+                r'|(?P<stars>\*+)'
+                r')'
+            ),
             
-            # Code blocks with language
-            'code_block': re.compile(r'```(\w*)\n(.*?)\n```', re.DOTALL),
+            # Unordered list items
+            'unordered_list': re.compile(r'^[ \t]*[-*+]\s+(.+)$'),
             
-            # Inline code
-            'inline_code': re.compile(r'`(.+?)`'),
+            # Ordered list items
+            'ordered_list': re.compile(r'^[ \t]*(\d+)\.\s+(.+)$'),
             
-            # Links
-            'link': re.compile(r'\[(.+?)\]\((.+?)\)'),
+            # Horizontal rule
+            'hr': re.compile(r'^([-*_])\1{2,}$'),
             
-            # Images
-            'image': re.compile(r'!\[(.+?)\]\((.+?)\)'),
+            # Blockquote
+            'blockquote': re.compile(r'^>\s?(.*)$'),
             
-            # Unordered lists
-            'unordered_list': re.compile(r'^[ \t]*[-*+]\s+(.+)$', re.MULTILINE),
+            # Table rows
+            'table': re.compile(r'^\|(.+)\|$'),
+        }
+    
+    def parse(self, lines: Iterable[str]) -> Iterator[Block]:
+        """
+        Tokenize Markdown lines into block nodes in a single pass
+        
+        Only the block currently being built is held in memory, so ``lines``
+        can be any iterable, including an open file.
+        
+        Args:
+            lines: Markdown text split into lines (trailing newlines are ignored)
             
-            # Ordered lists
-            'ordered_list': re.compile(r'^[ \t]*(\d+)\.\s+(.+)$', re.MULTILINE),
+        Yields:
+            Block nodes, in document order
+        """
+        patterns = self.patterns
+        # The block being built: its kind and the lines collected so far
+        kind = None
+        buffer = []
+        list_ordered = False
+        code_language = ''
+        
+        # Column alignments of the table being streamed
+        alignments = ()
+        
+        def flush():
+            if kind == 'paragraph':
+                return (Paragraph(' '.join(buffer)),)
+            if kind == 'list':
+                return (ListBlock(list_ordered, tuple(buffer)),)
+            if kind == 'blockquote':
+                paragraphs = []
+                current = []
+                for line in buffer + ['']:
+                    if line.strip():
+                        current.append(line)
+                    elif current:
+                        paragraphs.append(' '.join(current))
+                        current = []
+                return (Blockquote(tuple(paragraphs)),)
+            if kind == 'table':
+                # A header row with nothing after it
+                header = self._split_row(buffer[0])
+                return TableHead(header, (None,) * len(header)), TableEnd()
+            if kind == 'table_body':
+                return (TableEnd(),)
+            return ()
+        
+        for line in lines:
+            line = line.rstrip('\r\n')
             
-            # Horizontal rule
-            'hr': re.compile(r'^([-*_])\1{2,}$', re.MULTILINE),
+            if kind == 'code':
+                if line.strip() == '```':
+                    yield CodeBlock(code_language, '\n'.join(buffer))
+                    kind, buffer = None, []
+                else:
+                    buffer.append(line)
+                continue
             
-            # Blockquote
-            'blockquote': re.compile(r'^>\s+(.+)$', re.MULTILINE),
+            stripped = line.strip()
             
-            # Tables
-            'table': re.compile(r'^\|(.+)\|$', re.MULTILINE),
+            # Blank line: ends the current block
+            if not stripped:
+                if kind is not None:
+                    yield from flush()
+                    kind, buffer = None, []
+                continue
             
-            # Paragraphs (non-empty lines)
-            'paragraph': re.compile(r'^(?!<h|<ul|<ol|<blockquote|<hr|<table|<pre)(.+)$', re.MULTILINE)
-        }
+            # Dispatch on the first character so plain text lines skip the regexes
+            first = stripped[0]
+            if first not in BLOCK_MARKERS:
+                if kind == 'list' and line[0] in ' \t':
+                    buffer[-1] += ' ' + stripped
+                    continue
+                if kind != 'paragraph':
+                    yield from flush()
+                    kind, buffer = 'paragraph', []
+                buffer.append(stripped)
+                continue
+            
+            match = patterns['code_fence'].match(stripped) if first == '`' else None
+            if match:
+                yield from flush()
+                kind, buffer = 'code', []
+                code_language = match.group(1)
+                continue
+            
+            match = patterns['headers'].match(line) if first == '#' else None
+            if match:
+                yield from flush()
+                kind, buffer = None, []
+                yield Heading(len(match.group(1)), match.group(2))
+                continue
+            
+            if patterns['hr'].match(stripped):
+                yield from flush()
+                kind, buffer = None, []
+                yield HorizontalRule()
+                continue
+            
+            unordered = patterns['unordered_list'].match(line)
+            ordered = None if unordered else patterns['ordered_list'].match(line)
+            if unordered or ordered:
+                item = unordered.group(1) if unordered else ordered.group(2)
+                if kind != 'list' or list_ordered != bool(ordered):
+                    yield from flush()
+                    kind, buffer = 'list', []
+                    list_ordered = bool(ordered)
+                buffer.append(item)
+                continue
+            
+            if kind == 'list' and line[0] in ' \t':
+                # Indented continuation of the previous list item
+                buffer[-1] += ' ' + stripped
+                continue
+            
+            match = patterns['blockquote'].match(line)
+            if match:
+                if kind != 'blockquote':
+                    yield from flush()
+                    kind, buffer = 'blockquote', []
+                buffer.append(match.group(1))
+                continue
+            
+            if patterns['table'].match(stripped):
+                if kind == 'table_body':
+                    yield TableRow(self._split_row(stripped, len(alignments)), alignments)
+                elif kind == 'table':
+                    # Second row: the delimiter row if it parses as one, else the first body row
+                    header = self._split_row(buffer[0])
+                    row_alignments = self._parse_alignments(stripped)
+                    if row_alignments is not None:
+                        alignments = (row_alignments + (None,) * len(header))[:len(header)]
+                    else:
+                        alignments = (None,) * len(header)
+                    yield TableHead(header, alignments)
+                    if row_alignments is None:
+                        yield TableRow(self._split_row(stripped, len(alignments)), alignments)
+                    kind, buffer = 'table_body', []
+                else:
+                    yield from flush()
+                    kind, buffer = 'table', [stripped]
+                continue
+            
+            if kind != 'paragraph':
+                yield from flush()
+                kind, buffer = 'paragraph', []
+            buffer.append(stripped)
+        
+        if kind == 'code':
+            # Unterminated fence: keep the content as code
+            yield CodeBlock(code_language, '\n'.join(buffer))
+        else:
+            yield from flush()
     
-    def _convert_headers(self, markdown):
-        """Convert Markdown headers to HTML"""
-        def replace_header(match):
-            level = len(match.group(1))
-            text = match.group(2)
-            return f'<h{level}>{text}</h{level}>\n'
-        
-        return self.patterns['headers'].sub(replace_header, markdown)
-    
-    def _convert_bold(self, markdown):
-        """Convert Markdown bold to HTML strong"""
-        return self.patterns['bold'].sub(r'<strong>\1</strong>', markdown)
-    
-    def _convert_italic(self, markdown):
-        """Convert Markdown italic to HTML em"""
-        return self.patterns['italic'].sub(r'<em>\1</em>', markdown)
-    
-    def _convert_code_block(self, markdown):
-        """Convert Markdown code blocks to HTML pre/code"""
-        def replace_code_block(match):
-            language = match.group(1)
-            code = match.group(2)
-            if language:
-                return f'<pre><code class="language-{language}">{code}</code></pre>'
-            return f'<pre><code>{code}</code></pre>'
-        
-        return self.patterns['code_block'].sub(replace_code_block, markdown)
-    
-    def _convert_inline_code(self, markdown):
-        """Convert Markdown inline code to HTML code"""
-        return self.patterns['inline_code'].sub(r'<code>\1</code>', markdown)
-    
-    def _convert_links(self, markdown):
-        """Convert Markdown links to HTML a"""
-        return self.patterns['link'].sub(r'<a href="\2">\1</a>', markdown)
-    
-    def _convert_images(self, markdown):
-        """Convert Markdown images to HTML img"""
-        return self.patterns['image'].sub(r'<img src="\2" alt="\1">', markdown)
-    
-    def _convert_unordered_lists(self, markdown):
-        """Convert Markdown unordered lists to HTML ul/li"""
-        # Find all list items
-        list_items = self.patterns['unordered_list'].findall(markdown)
-        
-        if not list_items:
-            return markdown
-        
-        # Replace with HTML list
-        html_list = '<ul>\n'
-        for item in list_items:
-            html_list += f'  <li>{item}</li>\n'
-        html_list += '</ul>\n'
-        
-        # Replace in the original markdown
-        return self.patterns['unordered_list'].sub('', markdown) + html_list
-    
-    def _convert_ordered_lists(self, markdown):
-        """Convert Markdown ordered lists to HTML ol/li"""
-        # Find all list items
-        list_items = self.patterns['ordered_list'].findall(markdown)
-        
-        if not list_items:
-            return markdown
-        
-        # Replace with HTML list
-        html_list = '<ol>\n'
-        for _, item in list_items:
-            html_list += f'  <li>{item}</li>\n'
-        html_list += '</ol>\n'
-        
-        # Replace in the original markdown
-        return self.patterns['ordered_list'].sub('', markdown) + html_list
-    
-    def _convert_horizontal_rule(self, markdown):
-        """Convert Markdown horizontal rule to HTML hr"""
-        return self.patterns['hr'].sub('<hr>', markdown)
-    
-    def _convert_blockquote(self, markdown):
-        """Convert Markdown blockquote to HTML blockquote"""
-        # Find all blockquote lines
-        blockquote_lines = self.patterns['blockquote'].findall(markdown)
-        
-        if not blockquote_lines:
-            return markdown
-        
-        # Replace with HTML blockquote
-        html_blockquote = '<blockquote>\n'
-        for line in blockquote_lines:
-            html_blockquote += f'  <p>{line}</p>\n'
-        html_blockquote += '</blockquote>\n'
-        
-        # Replace in the original markdown
-        return self.patterns['blockquote'].sub('', markdown) + html_blockquote
-    
-    def _convert_tables(self, markdown):
-        """Convert Markdown tables to HTML tables"""
-        # This is a simplified implementation
-        lines = markdown.split('\n')
-        table_lines = []
-        in_table = False
-        
-        for i, line in enumerate(lines):
-            if line.startswith('|') and line.endswith('|'):
-                if not in_table:
-                    in_table = True
-                    table_lines.append(i)
-                table_lines.append(line)
-            elif in_table:
-                in_table = False
-        
-        if not table_lines:
-            return markdown
-        
-        # Process table lines
-        # This is a very basic implementation that would need to be expanded
-        html_table = '<table>\n'
-        html_table += '  <tr>\n'
-        for cell in table_lines[0].strip('|').split('|'):
-            html_table += f'    <th>{cell.strip()}</th>\n'
-        html_table += '  </tr>\n'
-        
-        for line in table_lines[2:]:
-            html_table += '  <tr>\n'
-            for cell in line.strip('|').split('|'):
-                html_table += f'    <td>{cell.strip()}</td>\n'
-            html_table += '  </tr>\n'
-        
-        html_table += '</table>\n'
-        
-        # Replace in the original markdown
-        # This is simplified and would need to be improved
-        return markdown + html_table
-    
-    def _convert_paragraphs(self, markdown):
-        """Convert plain text to HTML paragraphs"""
-        lines = markdown.split('\n')
-        html_lines = []
-        current_paragraph = []
+    @staticmethod
+    def _split_row(line, columns=None):
+        """
+        Split a table row into stripped cell texts
         
-        for line in lines:
-            if line.strip():
-                current_paragraph.append(line)
-            elif current_paragraph:
-                html_lines.append(f'<p>{" ".join(current_paragraph)}</p>')
-                current_paragraph = []
+        Args:
+            line: The row, with its leading and trailing pipes
+            columns: Pad with empty cells or truncate to this many cells (optional)
+        """
+        inner = line[1:-1]
+        if '\\|' in inner:
+            # Escaped pipes belong to the cell text
+            cells = [cell.replace('\\|', '|') for cell in TABLE_CELL_SPLIT.split(inner)]
+        else:
+            cells = inner.split('|')
+        if columns is not None and len(cells) != columns:
+            cells = (cells + [''] * columns)[:columns]
+        return tuple(cell.strip() for cell in cells)
+    
+    @staticmethod
+    def _parse_alignments(line):
+        """
+        Parse a header delimiter row (e.g. |---|:--:|--:|)
+        
+        Returns:
+            Tuple of column alignments (None, 'left', 'center' or 'right'),
+            or None if the row is not a delimiter row
+        """
+        alignments = []
+        for cell in line[1:-1].split('|'):
+            cell = cell.strip()
+            if not cell or cell.strip(':').strip('-') or '-' not in cell:
+                return None
+            if cell[0] == ':':
+                alignments.append('center' if cell[-1] == ':' and len(cell) > 1 else 'left')
+            else:
+                alignments.append('right' if cell[-1] == ':' else None)
+        return tuple(alignments)
+    
+    def _convert_inline(self, text):
+        """
+        Apply inline formatting (code, images, links, bold, italic) to a block's text
+        
+        The text is scanned once. Code spans and images are emitted as soon as
+        they match, so nothing inside them is formatted further; link brackets
+        and asterisk runs go on a delimiter stack and are paired when a link
+        closes or at the end of the text.
+        """
+        # &, < and > are never markup, so the text is escaped once up front
+        text = escape_text(text)
+        # Cheap check first: most text has no markup at all
+        if '*' not in text and '`' not in text and '[' not in text:
+            return text
+        
+        out = []
+        delimiters = []
+        # Positions of unmatched '[' entries in delimiters
+        brackets = []
+        # Backtick run length -> position up to which no closing run exists
+        no_closer = {}
+        position = 0
+        append = out.append
+        search = self.patterns['inline'].search
+        while True:
+            match = search(text, position)
+            if match is None:
+                break
+            start, end = match.span()
+            if start > position:
+                append(text[position:start])
+            position = end
+            kind = match.lastgroup
+            
+            if kind == 'ticks':
+                closer = self._find_code_closer(text, end, end - start, no_closer)
+                if closer < 0:
+                    append(match.group())
+                else:
+                    append(f'<code>{text[end:closer]}</code>')
+                    position = closer + end - start
+            elif kind == 'strong':
+                append(f'<strong>{match["strong"]}</strong>')
+            elif kind == 'em':
+                append(f'<em>{match["em"]}</em>')
+            elif kind == 'both':
+                append(f'<em><strong>{match["both"]}</strong></em>')
+            elif kind == 'url':
+                append(f'<a href="{_escape_quotes(match["url"])}">{match["label"]}</a>')
+            elif kind == 'src':
+                append(f'<img src="{_escape_quotes(match["src"])}" alt="{_escape_quotes(match["alt"])}">')
+            elif kind == 'open':
+                brackets.append(len(delimiters))
+                delimiters.append(_Delimiter('[', len(out), 1, False, False))
+                append('[')
+            elif kind == 'href':
+                if not brackets:
+                    append(match.group())
+                    continue
+                opener = brackets.pop()
+                self._resolve_emphasis(out, delimiters, opener + 1)
+                out[delimiters[opener].index] = f'<a href="{_escape_quotes(match["href"])}">'
+                append('</a>')
+                del delimiters[opener:]
+            else:
+                before = text[start - 1] if start else ' '
+                after = text[position] if position < len(text) else ' '
+                delimiters.append(_Delimiter('*', len(out), position - start,
+                                             not after.isspace(), not before.isspace()))
+                append('')
+        
+        if not out:
+            return text
+        out.append(text[position:])
+        self._resolve_emphasis(out, delimiters, 0)
+        return ''.join(out)
+    
+    @staticmethod
+    def _find_code_closer(text, start, length, no_closer):
+        """
+        Find the backtick run closing a code span
         
-        if current_paragraph:
-            html_lines.append(f'<p>{" ".join(current_paragraph)}</p>')
+        The closer is a run of exactly `length` backticks on the same line,
+        with at least one character before it. Failed searches are remembered
+        per run length, so each stretch of a line is searched at most once
+        per length and unclosed runs cannot make the scan quadratic.
         
-        return '\n'.join(html_lines)
+        Args:
+            text: Text being scanned
+            start: Position just after the opening run
+            length: Length of the opening run
+            no_closer: Run length -> end of a stretch known to have no closer
+        
+        Returns:
+            Position of the closing run, or -1
+        """
+        if start < no_closer.get(length, -1):
+            return -1
+        line_end = text.find('\n', start)
+        if line_end < 0:
+            line_end = len(text)
+        ticks = '`' * length
+        position = start + 1
+        while True:
+            found = text.find(ticks, position, line_end)
+            if found < 0:
+                no_closer[length] = line_end
+                return -1
+            run_end = found + length
+            while run_end < line_end and text[run_end] == '`':
+                run_end += 1
+            if run_end - found == length and text[found - 1] != '`':
+                return found
+            position = run_end
+    
+    @staticmethod
+    def _resolve_emphasis(out, delimiters, bottom):
+        """
+        Pair asterisk runs above the stack bottom into <em> and <strong> tags
+        
+        Each closer is matched with the nearest open run before it; two asterisks
+        are used from each side when both have them (strong), otherwise one
+        (em). Asterisks that end up unmatched are written out literally.
+        
+        Args:
+            out: Output fragments, updated in place
+            delimiters: Delimiter stack
+            bottom: Index of the first delimiter to consider
+        """
+        runs = [d for d in delimiters[bottom:] if d.char == '*']
+        # Runs that can still open, nearest last: each run is pushed and popped
+        # at most once, which keeps unbalanced input linear
+        openers = []
+        for run in runs:
+            if run.can_close:
+                while run.count and openers:
+                    opener = openers[-1]
+                    use = 2 if opener.count >= 2 and run.count >= 2 else 1
+                    tag = 'strong' if use == 2 else 'em'
+                    opener.count -= use
+                    run.count -= use
+                    opener.opens.append(f'<{tag}>')
+                    run.closes.append(f'</{tag}>')
+                    if not opener.count:
+                        openers.pop()
+            if run.can_open and run.count:
+                openers.append(run)
+        # Tags from the first (innermost) match sit closest to the enclosed text
+        for run in runs:
+            out[run.index] = ''.join(run.closes) + '*' * run.count + ''.join(reversed(run.opens))
+    
+    def write_block(self, block: Block, write):
+        """
+        Render one block node to HTML, fragment by fragment
+        
+        Args:
+            block: A node produced by parse()
+            write: Callable receiving each HTML fragment, e.g. HtmlWriter.write
+                or the write method of an open file
+        """
+        inline = self._convert_inline
+        
+        if isinstance(block, Paragraph):
+            write(f'<p>{inline(block.text)}</p>')
+        
+        elif isinstance(block, Heading):
+            write(f'<h{block.level}>{inline(block.text)}</h{block.level}>')
+        
+        elif isinstance(block, ListBlock):
+            tag = 'ol' if block.ordered else 'ul'
+            write(f'<{tag}>\n')
+            for item in block.items:
+                write(f'  <li>{inline(item)}</li>\n')
+            write(f'</{tag}>')
+        
+        elif isinstance(block, CodeBlock):
+            if block.language:
+                write(f'<pre><code class="language-{escape_attribute(block.language)}">')
+            else:
+                write('<pre><code>')
+            write(escape_text(block.code))
+            write('</code></pre>')
+        
+        elif isinstance(block, Blockquote):
+            write('<blockquote>\n')
+            for text in block.paragraphs:
+                write(f'  <p>{inline(text)}</p>\n')
+            write('</blockquote>')
+        
+        elif isinstance(block, TableRow):
+            # Rows are the unit of streaming for tables, so each is written in one call
+            cells = ''.join([f'    <td{ALIGN_STYLES[alignment]}>{inline(cell)}</td>\n'
+                             for cell, alignment in zip(block.cells, block.alignments)])
+            write(f'  <tr>\n{cells}  </tr>')
+        
+        elif isinstance(block, TableHead):
+            cells = ''.join([f'    <th{ALIGN_STYLES[alignment]}>{inline(cell)}</th>\n'
+                             for cell, alignment in zip(block.header, block.alignments)])
+            write(f'<table>\n  <tr>\n{cells}  </tr>')
+        
+        elif isinstance(block, TableEnd):
+            write('</table>')
+        
+        elif isinstance(block, HorizontalRule):
+            write('<hr>')
+        
+        else:
+            raise TypeError(f"Unknown block type: {type(block).__name__}")
+    
+    def render_block(self, block: Block) -> str:
+        """
+        Render one block node to HTML
+        
+        Args:
+            block: A node produced by parse()
+            
+        Returns:
+            HTML text for the block
+        """
+        writer = HtmlWriter()
+        self.write_block(block, writer.write)
+        return writer.getvalue()
+    
+    def _render_cached(self, block: Block) -> str:
+        """Render a block through the fragment cache"""
+        # A cache lookup costs more than rendering a small block
+        min_size = self.fragment_cache.min_size
+        if isinstance(block, (Paragraph, Heading)) and len(block.text) < min_size:
+            return self.render_block(block)
+        key = repr(block)
+        if len(key) < min_size:
+            return self.render_block(block)
+        html = self.fragment_cache.get(key)
+        if html is None:
+            html = self.render_block(block)
+            self.fragment_cache.put(key, html)
+        return html
+    
+    def _write_blocks(self, blocks: Iterable[Block], write):
+        """Render blocks one after another, separated by newlines"""
+        separator = ''
+        if self.fragment_cache is None:
+            for block in blocks:
+                write(separator)
+                self.write_block(block, write)
+                separator = '\n'
+        else:
+            for block in blocks:
+                write(separator)
+                write(self._render_cached(block))
+                separator = '\n'
     
     def convert(self, markdown):
         """
@@ -220,32 +715,38 @@ class MarkdownConverter:
         Returns:
             HTML text
         """
-        html = markdown
-        
-        # Apply conversions in order
-        html = self._convert_headers(html)
-        html = self._convert_bold(html)
-        html = self._convert_italic(html)
-        html = self._convert_code_block(html)
-        html = self._convert_inline_code(html)
-        html = self._convert_links(html)
-        html = self._convert_images(html)
-        html = self._convert_unordered_lists(html)
-        html = self._convert_ordered_lists(html)
-        html = self._convert_horizontal_rule(html)
-        html = self._convert_blockquote(html)
-        html = self._convert_tables(html)
-        html = self._convert_paragraphs(html)
-        
-        return html
+        lines = normalize_newlines(markdown).split('\n')
+        if lines[-1] == '':
+            lines.pop()
+        writer = HtmlWriter()
+        self._write_blocks(self.parse(lines), writer.write)
+        return writer.getvalue()
     
-    def convert_file(self, input_file, output_file=None):
+    def convert_stream(self, reader, writer, title=''):
+        """
+        Convert Markdown to a full HTML document incrementally
+
+        Only the block being parsed is held in memory; each block is written
+        out as soon as it is complete, so memory stays bounded regardless of
+        input size.
+
+        Args:
+            reader: Iterable of Markdown lines, e.g. a file opened for reading
+            writer: Object with a write() method, e.g. a file opened for writing
+            title: Document title
+        """
+        writer.write(HTML_HEAD.format(title=escape_text(title)))
+        self._write_blocks(self.parse(line.rstrip('\r\n') for line in reader), writer.write)
+        writer.write(HTML_TAIL)
+
+    def convert_file(self, input_file, output_file=None, cache=None):
         """
         Convert a Markdown file to HTML
         
         Args:
             input_file: Path to the Markdown file
             output_file: Path to the output HTML file (optional)
+            cache: BuildCache used to skip files whose output is current (optional)
             
         Returns:
             HTML text
@@ -255,57 +756,862 @@ class MarkdownConverter:
         if not input_path.exists():
             raise FileNotFoundError(f"Input file not found: {input_file}")
         
-        with open(input_path, 'r', encoding='utf-8') as f:
-            markdown = f.read()
+        with open(input_path, 'rb') as f:
+            data = f.read()
         
+        digest = source_digest(data)
+        if cache is not None and output_file and cache.is_current(output_file, digest):
+            print(f"HTML file up to date: {output_file}")
+            return Path(output_file).read_text(encoding='utf-8')
+        
+        markdown = data.decode('utf-8')
         html = self.convert(markdown)
         
-        # Add HTML document structure
-        html_document = f"""<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="UTF-8">
-    <title>{input_path.stem}</title>
-    <style>
-        body {{ font-family: Arial, sans-serif; line-height: 1.6; padding: 20px; max-width: 800px; margin: 0 auto; }}
-        code {{ background-color: #f4f4f4; padding: 2px 4px; border-radius: 3px; }}
-        pre {{ background-color: #f4f4f4; padding: 10px; border-radius: 5px; overflow-x: auto; }}
-        blockquote {{ border-left: 4px solid #ddd; padding-left: 10px; color: #666; }}
-        img {{ max-width: 100%; }}
-        table {{ border-collapse: collapse; width: 100%; }}
-        th, td {{ border: 1px solid #ddd; padding: 8px; }}
-        th {{ background-color: #f2f2f2; }}
-    </style>
-</head>
-<body>
-{html}
-</body>
-</html>"""
+        html_document = HTML_HEAD.format(title=escape_text(input_path.stem)) + html + HTML_TAIL
         
         if output_file:
             output_path = Path(output_file)
             with open(output_path, 'w', encoding='utf-8') as f:
                 f.write(html_document)
             print(f"HTML file created: {output_path}")
+            if cache is not None:
+                cache.record(output_file, digest)
         
         return html_document
 
 
+class FragmentCache:
+    """
+    Rendered HTML of individual blocks, kept across runs in an SQLite file
+    
+    Blocks are keyed by a digest of the parsed node, so a small edit to a
+    large file only re-renders the blocks that changed. Blocks smaller than
+    min_size are cheaper to render than to look up and are not cached.
+    The store records the CONVERTER_VERSION that rendered its fragments and
+    is emptied when opened by a different version.
+    """
+    
+    def __init__(self, path, min_size=1024):
+        """
+        Open (or create) the fragment store
+        
+        Args:
+            path: Path to the SQLite file
+            min_size: Smallest block, in characters of its parsed form, worth caching
+        """
+        self.min_size = min_size
+        self.conn = sqlite3.connect(str(path), timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS fragments (key BLOB PRIMARY KEY, html TEXT NOT NULL)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._check_version()
+        self.pending: Dict[bytes, str] = {}
+        self.hits = 0
+        self.misses = 0
+    
+    def _check_version(self):
+        """Drop fragments rendered by another converter version"""
+        # Immediate transaction: workers opening the store together agree on one upgrade
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = self.conn.execute("SELECT value FROM meta WHERE name = 'converter_version'").fetchone()
+            if row is None or row[0] != CONVERTER_VERSION:
+                self.conn.execute("DELETE FROM fragments")
+                self.conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('converter_version', ?)",
+                                  (CONVERTER_VERSION,))
+            self.conn.commit()
+        except BaseException:
+            self.conn.rollback()
+            raise
+    
+    @staticmethod
+    def key(node: str) -> bytes:
+        """Digest identifying a parsed block, given its repr()"""
+        return hashlib.blake2b(node.encode('utf-8'), digest_size=16).digest()
+    
+    def get(self, node: str) -> Optional[str]:
+        """Cached HTML for a block, given its repr(), or None"""
+        key = self.key(node)
+        html = self.pending.get(key)
+        if html is None:
+            row = self.conn.execute("SELECT html FROM fragments WHERE key = ?", (key,)).fetchone()
+            html = row[0] if row else None
+        if html is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return html
+    
+    def put(self, node: str, html: str):
+        """Remember the HTML rendered for a block, given its repr(), until the next flush()"""
+        self.pending[self.key(node)] = html
+    
+    def flush(self):
+        """Write newly rendered fragments to disk"""
+        if self.pending:
+            with self.conn:
+                self.conn.executemany("INSERT OR REPLACE INTO fragments (key, html) VALUES (?, ?)",
+                                      self.pending.items())
+            self.pending.clear()
+    
+    def close(self):
+        """Flush and close the store"""
+        self.flush()
+        self.conn.close()
+
+
+class BuildCache:
+    """
+    Manifest of converted files, used to skip files whose output is current
+    
+    An output is current when its source digest matches the manifest entry
+    and the converter version and template are the ones that produced it;
+    a version or template change discards the whole manifest.
+    """
+    
+    MANIFEST = 'manifest.json'
+    FRAGMENTS = 'fragments.sqlite'
+    
+    def __init__(self, directory):
+        """
+        Load the manifest from a cache directory
+        
+        Args:
+            directory: Cache directory, created if missing
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.manifest_path = self.directory / self.MANIFEST
+        self.fragments_path = self.directory / self.FRAGMENTS
+        self.entries: Dict[str, str] = {}
+        
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            manifest = None
+        
+        # Fragments check the converter version themselves (see FragmentCache)
+        if (manifest and manifest.get('converter_version') == CONVERTER_VERSION and
+                manifest.get('template_hash') == TEMPLATE_HASH):
+            self.entries = manifest.get('files', {})
+    
+    def is_current(self, output_file, digest: str) -> bool:
+        """
+        Check whether an output was built from this exact source
+        
+        Args:
+            output_file: Path to the output HTML file
+            digest: source_digest() of the source as it is now
+        """
+        return self.lookup(output_file) == digest and os.path.exists(output_file)
+    
+    def lookup(self, output_file) -> Optional[str]:
+        """Source digest recorded for an output, or None"""
+        return self.entries.get(os.path.abspath(output_file))
+    
+    def record(self, output_file, digest: str):
+        """Record that an output was built from a source with this digest"""
+        self.entries[os.path.abspath(output_file)] = digest
+    
+    def save(self):
+        """Write the manifest atomically"""
+        manifest = {
+            'converter_version': CONVERTER_VERSION,
+            'template_hash': TEMPLATE_HASH,
+            'files': self.entries,
+        }
+        tmp_path = self.manifest_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.manifest_path)
+
+
+# Blank lines (and runs of them) separating independent sections of a document
+SECTION_BREAK = re.compile(r'(\n\s*\n)')
+
+# A backtick fence and the rest of its line
+FENCE_LINE = re.compile(r'```[^\n]*')
+
+
+def split_sections(markdown: str, code_fence=re.compile(r'^```(\w*)\s*$')) -> List[str]:
+    """
+    Split a document on blank lines outside fenced code
+    
+    The block parser carries no state across such a blank line, so each
+    section converts independently and joining the sections' HTML with
+    newlines gives the same result as converting the whole document.
+    
+    Args:
+        markdown: Markdown text
+        
+    Returns:
+        The sections' text, in document order
+    """
+    pieces = SECTION_BREAK.split(normalize_newlines(markdown))
+    sections = []
+    in_code = False
+    current = []
+    # pieces alternates section text and the blank lines after it
+    for i in range(0, len(pieces), 2):
+        text = pieces[i]
+        current.append(text)
+        if '```' in text:
+            for match in FENCE_LINE.finditer(text):
+                start = match.start()
+                if text[text.rfind('\n', 0, start) + 1:start].strip():
+                    # Not at the start of its line
+                    continue
+                fence = match.group().rstrip()
+                if in_code:
+                    in_code = fence != '```'
+                elif code_fence.match(fence):
+                    in_code = True
+        if in_code and i + 1 < len(pieces):
+            # Blank lines inside a code block are content: keep them, and keep going
+            current.append(pieces[i + 1])
+            continue
+        sections.append(''.join(current))
+        current = []
+    if current:
+        sections.append(''.join(current))
+    return sections
+
+
+class LiveDocument:
+    """
+    A document kept in memory between conversions, for watch mode
+    
+    The rendered HTML of each section (see split_sections) is remembered, so
+    after an edit only the sections whose text changed are parsed and
+    rendered again.
+    """
+    
+    def __init__(self, converter: MarkdownConverter):
+        """
+        Args:
+            converter: Converter used for changed sections
+        """
+        self.converter = converter
+        self.sections: Dict[str, str] = {}
+        self.rendered = 0
+        self.total = 0
+    
+    def render(self, markdown: str) -> str:
+        """
+        Convert the document's current text to HTML
+        
+        Args:
+            markdown: Markdown text
+            
+        Returns:
+            HTML text, identical to MarkdownConverter.convert(markdown)
+        """
+        previous = self.sections
+        sections = {}
+        parts = []
+        self.rendered = 0
+        for section in split_sections(markdown):
+            html = sections.get(section)
+            if html is None:
+                html = previous.get(section)
+                if html is None:
+                    html = self.converter.convert(section)
+                    self.rendered += 1
+                sections[section] = html
+            if html:
+                parts.append(html)
+        self.sections = sections
+        self.total = len(parts)
+        return '\n'.join(parts)
+
+
+# File extensions picked up when a directory is given in batch mode
+MARKDOWN_SUFFIXES = ('.md', '.markdown')
+
+# Converter owned by the current batch worker process, created once by _init_worker()
+_worker_converter = None
+
+
+def _has_wildcards(pattern):
+    """Whether a path or pattern contains glob wildcards"""
+    return any(char in pattern for char in '*?[')
+
+
+def _glob_root(pattern):
+    """Leading directories of a glob pattern that contain no wildcards"""
+    parts = []
+    for part in Path(pattern).parts[:-1]:
+        if _has_wildcards(part):
+            break
+        parts.append(part)
+    return Path(*parts) if parts else Path('.')
+
+
+def collect_inputs(inputs: Iterable[str]) -> List[Tuple[Path, Path]]:
+    """
+    Expand files, directories and glob patterns into Markdown files
+
+    Args:
+        inputs: Paths or glob patterns given on the command line
+
+    Returns:
+        List of (source file, root) pairs; the output tree mirrors each file's
+        path relative to its root
+    """
+    sources = []
+    for item in inputs:
+        path = Path(item)
+        if path.is_dir():
+            sources.extend((source, path) for source in sorted(path.rglob('*'))
+                           if source.suffix.lower() in MARKDOWN_SUFFIXES and source.is_file())
+        elif _has_wildcards(item):
+            root = _glob_root(item)
+            sources.extend((Path(match), root) for match in sorted(glob.glob(item, recursive=True))
+                           if os.path.isfile(match))
+        elif path.is_file():
+            sources.append((path, path.parent))
+        else:
+            raise FileNotFoundError(f"Input file not found: {item}")
+    return sources
+
+
+def plan_outputs(inputs: Iterable[str], output_dir: Optional[str] = None) -> List[Tuple[Path, Path]]:
+    """
+    Expand inputs and choose the output file for each
+
+    Args:
+        inputs: Files, directories or glob patterns
+        output_dir: Directory mirroring the input tree (default: next to each input)
+
+    Returns:
+        List of (source file, output file) pairs
+    """
+    plan = []
+    for source, root in collect_inputs(inputs):
+        if output_dir:
+            plan.append((source, Path(output_dir) / source.relative_to(root).with_suffix('.html')))
+        else:
+            plan.append((source, source.with_suffix('.html')))
+    return plan
+
+
+def _init_worker(fragments_path=None):
+    """
+    Create the converter reused by every task in this worker process
+    
+    Args:
+        fragments_path: FragmentCache file shared by the workers (optional)
+    """
+    global _worker_converter
+    fragment_cache = FragmentCache(fragments_path) if fragments_path else None
+    _worker_converter = MarkdownConverter(fragment_cache)
+
+
+def _convert_task(task: Tuple[str, str, Optional[str]]) -> Tuple[str, str, int, Optional[str], bool, Optional[str]]:
+    """
+    Convert one file in a batch worker
+
+    Args:
+        task: (source path, output path, source digest recorded in the build
+            manifest or None)
+
+    Returns:
+        (source path, output path, input size in bytes, source digest,
+        whether the output was already current, error message or None)
+    """
+    source, output, previous_digest = task
+    try:
+        with open(source, 'rb') as f:
+            data = f.read()
+        digest = source_digest(data)
+        if digest == previous_digest and os.path.exists(output):
+            return source, output, len(data), digest, True, None
+
+        os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+        with open(output, 'w', encoding='utf-8') as writer:
+            reader = io.StringIO(data.decode('utf-8'), newline=None)
+            _worker_converter.convert_stream(reader, writer, title=Path(source).stem)
+        if _worker_converter.fragment_cache is not None:
+            _worker_converter.fragment_cache.flush()
+        return source, output, len(data), digest, False, None
+    except Exception as e:
+        return source, output, 0, None, False, str(e)
+
+
+def convert_batch(inputs: Iterable[str], output_dir: Optional[str] = None,
+                  jobs: Optional[int] = None, chunksize: int = 32,
+                  cache_dir: Optional[str] = None, fragments: bool = False) -> int:
+    """
+    Convert many Markdown files across a process pool
+
+    Args:
+        inputs: Files, directories or glob patterns
+        output_dir: Directory mirroring the input tree (default: next to each input)
+        jobs: Number of worker processes (default: CPU count)
+        chunksize: Files handed to a worker per task submission
+        cache_dir: BuildCache directory; files whose output is current are skipped (optional)
+        fragments: Also cache rendered blocks in the cache directory
+
+    Returns:
+        Number of files that failed to convert
+    """
+    cache = BuildCache(cache_dir) if cache_dir else None
+    fragments_path = str(cache.fragments_path) if cache is not None and fragments else None
+
+    tasks = []
+    for source, output in plan_outputs(inputs, output_dir):
+        previous_digest = cache.lookup(output) if cache is not None else None
+        tasks.append((str(source), str(output), previous_digest))
+
+    jobs = jobs or os.cpu_count() or 1
+    start = time.perf_counter()
+    if jobs == 1:
+        _init_worker(fragments_path)
+        summary = _collect_results(map(_convert_task, tasks), cache)
+    else:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                 initargs=(fragments_path,)) as pool:
+            summary = _collect_results(pool.map(_convert_task, tasks, chunksize=chunksize), cache)
+    elapsed = time.perf_counter() - start
+    failures, skipped, total_bytes = summary
+    if cache is not None:
+        cache.save()
+
+    converted = len(tasks) - failures - skipped
+    rate = len(tasks) / elapsed if elapsed else 0.0
+    mb_rate = total_bytes / (1 << 20) / elapsed if elapsed else 0.0
+    print(f"Converted {converted}/{len(tasks)} files ({skipped} up to date, {failures} failed, "
+          f"{total_bytes / (1 << 20):.1f} MiB) in {elapsed:.2f}s with {jobs} workers: "
+          f"{rate:.1f} files/s, {mb_rate:.1f} MiB/s")
+    return failures
+
+
+def _collect_results(results, cache=None):
+    """Report failed conversions, record built outputs and total up the bytes read"""
+    failures = 0
+    skipped = 0
+    total_bytes = 0
+    for source, output, size, digest, current, error in results:
+        if error is not None:
+            failures += 1
+            print(f"Error: {source}: {error}")
+            continue
+        if current:
+            skipped += 1
+        elif cache is not None:
+            cache.record(output, digest)
+        total_bytes += size
+    return failures, skipped, total_bytes
+
+
+# Script injected into pages served by the preview server: reload when this page is rebuilt
+RELOAD_SCRIPT = """<script>
+new EventSource("/__events").onmessage = function (event) {
+    if (event.data === decodeURIComponent(location.pathname)) { location.reload(); }
+};
+</script>
+"""
+
+
+class ReloadBroadcaster:
+    """Tells preview server clients which pages were rebuilt"""
+    
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.generation = 0
+        self.changed: List[str] = []
+    
+    def publish(self, url_path: str):
+        """Announce that the page at url_path (not percent-encoded) was rebuilt"""
+        with self.condition:
+            self.generation += 1
+            self.changed = self.changed[-99:] + [url_path]
+            self.condition.notify_all()
+    
+    def wait(self, generation: int, timeout: float) -> Tuple[int, List[str]]:
+        """
+        Wait for pages rebuilt after a given generation
+        
+        Returns:
+            The current generation and the pages rebuilt since `generation`
+            (empty on timeout)
+        """
+        with self.condition:
+            self.condition.wait_for(lambda: self.generation != generation, timeout)
+            missed = self.generation - generation
+            return self.generation, self.changed[-missed:] if missed else []
+
+
+class PreviewHandler(SimpleHTTPRequestHandler):
+    """Serves the output directory, adding the reload script to HTML pages, and the /__events stream"""
+    
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        if path == '/__events':
+            self._stream_events()
+            return
+        file_path = self.translate_path(self.path)
+        if file_path.endswith('.html') and os.path.isfile(file_path):
+            with open(file_path, 'rb') as f:
+                page = f.read()
+            page = page.replace(b'</body>', RELOAD_SCRIPT.encode('utf-8') + b'</body>', 1)
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(page)))
+            self.send_header('Cache-Control', 'no-store')
+            self.end_headers()
+            self.wfile.write(page)
+            return
+        super().do_GET()
+    
+    def _stream_events(self):
+        """Server-sent events: one message per rebuilt page, with keepalives in between"""
+        broadcaster = self.server.broadcaster
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        generation = broadcaster.generation
+        try:
+            while True:
+                generation, changed = broadcaster.wait(generation, timeout=15)
+                message = ''.join(f'data: {path}\n\n' for path in changed) or ': keepalive\n\n'
+                self.wfile.write(message.encode('utf-8'))
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+    
+    def log_message(self, format, *args):
+        """Keep the console for rebuild messages"""
+
+
+def start_preview_server(root: Path, port: int) -> ThreadingHTTPServer:
+    """
+    Serve a directory on localhost in a background thread
+    
+    Args:
+        root: Directory to serve
+        port: TCP port on 127.0.0.1
+        
+    Returns:
+        The running server; its `broadcaster` announces rebuilt pages
+    """
+    server = ThreadingHTTPServer(('127.0.0.1', port), partial(PreviewHandler, directory=str(root)))
+    server.daemon_threads = True
+    server.broadcaster = ReloadBroadcaster()
+    threading.Thread(target=server.serve_forever, name='preview-server', daemon=True).start()
+    return server
+
+
+def _stat_key(path: Path):
+    """What watch mode compares to notice a change: (mtime_ns, size), or None if the file is gone"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def watch(plan_inputs, serve_port: Optional[int] = None, debounce: float = 0.025,
+          poll_interval: float = 0.01, rescan_interval: float = 1.0):
+    """
+    Convert inputs, then keep converting each one again whenever it changes
+    
+    Each file is polled with os.stat(); a change is rebuilt once the file has
+    been quiet for `debounce` seconds, so an editor's burst of writes causes
+    one rebuild. Every document is kept in memory as a LiveDocument, so a
+    rebuild only renders the sections that changed. Runs until interrupted.
+    
+    Args:
+        plan_inputs: Function returning the current list of (source, output)
+            pairs; called again every `rescan_interval` seconds to pick up
+            new files
+        serve_port: Port for the live preview server on localhost (optional)
+        debounce: Seconds a file must be unchanged before it is rebuilt
+        poll_interval: Seconds between polls
+        rescan_interval: Seconds between looking for new input files
+    """
+    converter = MarkdownConverter()
+    documents: Dict[Path, LiveDocument] = {}
+    outputs: Dict[Path, Path] = {}
+    seen: Dict[Path, object] = {}
+    pending: Dict[Path, float] = {}
+    server = None
+    
+    def rebuild(source: Path):
+        start = time.perf_counter()
+        try:
+            with open(source, 'r', encoding='utf-8') as f:
+                markdown = f.read()
+        except (OSError, UnicodeDecodeError) as e:
+            print(f"Error: {source}: {e}")
+            return
+        document = documents.setdefault(source, LiveDocument(converter))
+        html = document.render(markdown)
+        output = outputs[source]
+        output.parent.mkdir(parents=True, exist_ok=True)
+        # Write then rename, so the preview never serves a half-written page
+        tmp_path = output.with_name(output.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(HTML_HEAD.format(title=escape_text(source.stem)) + html + HTML_TAIL)
+        os.replace(tmp_path, output)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"Rebuilt {output} in {elapsed:.1f} ms "
+              f"({document.rendered}/{document.total} sections re-rendered)")
+        if server is not None:
+            # Unquoted: browsers percent-encode paths differently from quote(), so the page decodes its own
+            server.broadcaster.publish('/' + output.resolve().relative_to(root).as_posix())
+    
+    def rescan():
+        try:
+            plan = plan_inputs()
+        except FileNotFoundError:
+            # An input named on the command line is gone for now; keep watching the rest
+            return
+        for source, output in plan:
+            if source not in outputs:
+                outputs[source] = output
+                seen[source] = _stat_key(source)
+                rebuild(source)
+    
+    plan = plan_inputs()
+    if serve_port is not None:
+        root = Path(os.path.commonpath([str(output.resolve().parent) for _, output in plan] or ['.']))
+        server = start_preview_server(root, serve_port)
+        for _, output in plan[:1]:
+            url_path = quote(output.resolve().relative_to(root).as_posix())
+            print(f"Serving preview at http://127.0.0.1:{serve_port}/{url_path}")
+    rescan()
+    print(f"Watching {len(outputs)} file(s) for changes (Ctrl+C to stop)")
+    
+    next_rescan = time.monotonic() + rescan_interval
+    try:
+        while True:
+            time.sleep(poll_interval)
+            now = time.monotonic()
+            for source in list(outputs):
+                key = _stat_key(source)
+                if key != seen[source]:
+                    seen[source] = key
+                    pending[source] = now
+            for source, changed_at in list(pending.items()):
+                if now - changed_at >= debounce:
+                    del pending[source]
+                    if seen[source] is not None:
+                        rebuild(source)
+            if now >= next_rescan:
+                next_rescan = now + rescan_interval
+                rescan()
+    except KeyboardInterrupt:
+        print("Stopped watching")
+    finally:
+        if server is not None:
+            server.shutdown()
+
+
+def handle_request(message: Dict, converter: Optional[MarkdownConverter] = None) -> Dict:
+    """
+    Serve one conversion request for the daemon (or its clients' fallback)
+    
+    Requests:
+        {"markdown": text}: convert text, returns {"html": fragment}
+        {"markdown": text, "title": title}: returns {"html": full document}
+        {"path": source, "output": path}: convert a file on disk ("output"
+            defaults to the source with an .html extension), returns
+            {"output": path}
+    
+    Args:
+        message: Decoded request
+        converter: Converter to use (default: this worker process' converter)
+        
+    Returns:
+        Response dictionary; failures are reported as {"error": message}
+    """
+    converter = converter or _worker_converter
+    try:
+        if 'markdown' in message:
+            html = converter.convert(message['markdown'])
+            if 'title' in message:
+                html = HTML_HEAD.format(title=escape_text(message['title'])) + html + HTML_TAIL
+            return {'html': html}
+        if 'path' in message:
+            source = Path(message['path'])
+            output = Path(message.get('output') or source.with_suffix('.html'))
+            with open(source, 'r', encoding='utf-8') as reader, \
+                    open(output, 'w', encoding='utf-8') as writer:
+                converter.convert_stream(reader, writer, title=source.stem)
+            return {'output': str(output)}
+        return {'error': "Request needs 'markdown' or 'path'"}
+    except Exception as e:
+        return {'error': f"{type(e).__name__}: {e}"}
+
+
+class ConversionRequestHandler(socketserver.StreamRequestHandler):
+    """Reads JSON-line requests from one client connection and answers each in order"""
+    
+    def handle(self):
+        for line in self.rfile:
+            try:
+                message = json.loads(line)
+            except ValueError:
+                response = {'error': 'Malformed request: expected one JSON object per line'}
+            else:
+                response = self.server.dispatch(message)
+            self.wfile.write(json.dumps(response).encode('utf-8') + b'\n')
+
+
+class ConversionDaemon(socketserver.ThreadingUnixStreamServer):
+    """
+    Long-lived conversion server on a Unix domain socket
+    
+    Each connection gets a thread. Conversions run on a warm converter, in a
+    pool of worker processes when jobs > 1 (so documents convert in parallel
+    despite the GIL) or directly in the connection thread otherwise, which
+    has the lowest latency.
+    """
+    
+    daemon_threads = True
+    
+    def __init__(self, socket_path: str, jobs: int = 1):
+        """
+        Args:
+            socket_path: Path to listen on
+            jobs: Number of worker processes; 1 converts in-process
+        """
+        self.pool = ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker) if jobs > 1 else None
+        _init_worker()
+        super().__init__(socket_path, ConversionRequestHandler)
+    
+    def dispatch(self, message: Dict) -> Dict:
+        """Run one request on the worker pool, or in this thread"""
+        if self.pool is None:
+            return handle_request(message)
+        return self.pool.submit(handle_request, message).result()
+    
+    def server_close(self):
+        super().server_close()
+        if self.pool is not None:
+            self.pool.shutdown()
+
+
+def run_daemon(socket_path: str, jobs: int = 1):
+    """
+    Serve conversion requests until interrupted
+    
+    Args:
+        socket_path: Path of the Unix socket; a stale one left by a dead
+            daemon is replaced
+        jobs: Number of worker processes
+    """
+    if os.path.exists(socket_path):
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(socket_path)
+        except OSError:
+            os.unlink(socket_path)
+        else:
+            raise RuntimeError(f"A daemon is already listening on {socket_path}")
+        finally:
+            probe.close()
+    
+    # Only the owner may connect: requests can read and write files as this user
+    old_umask = os.umask(0o077)
+    try:
+        server = ConversionDaemon(socket_path, jobs)
+    finally:
+        os.umask(old_umask)
+    print(f"Serving conversions on {socket_path} with {jobs} worker(s) (Ctrl+C to stop)")
+    # Exit through the cleanup below on SIGTERM too, so the socket file is removed
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Stopping daemon")
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
 def main():
     """Main function"""
     parser = argparse.ArgumentParser(description="Convert Markdown to HTML")
-    parser.add_argument("input", help="Input Markdown file")
+    parser.add_argument("input", nargs="*",
+                        help="Input Markdown file; several files, directories or globs for batch mode")
     parser.add_argument("-o", "--output", help="Output HTML file (default: input file with .html extension)")
+    parser.add_argument("--stream", action="store_true",
+                        help="Convert line by line, writing HTML as it goes (for very large files)")
+    parser.add_argument("--output-dir", help="Batch mode: write HTML here, mirroring the input tree")
+    parser.add_argument("-j", "--jobs", type=int,
+                        help="Batch and daemon mode: worker processes (default: CPU count, 1 for the daemon)")
+    parser.add_argument("--chunksize", type=int, default=32, help="Batch mode: files per worker task")
+    parser.add_argument("--watch", action="store_true",
+                        help="Keep running and convert inputs again whenever they change")
+    parser.add_argument("--serve", nargs="?", type=int, const=8000, metavar="PORT",
+                        help="With --watch, serve a live-reloading preview on 127.0.0.1 (default port: 8000)")
+    parser.add_argument("--debounce", type=float, default=0.025,
+                        help="Watch mode: seconds a file must be unchanged before it is rebuilt")
+    parser.add_argument("--daemon", action="store_true",
+                        help="Serve conversion requests on a Unix socket (see mdToHtmlClient.py); inputs are ignored")
+    parser.add_argument("--socket", help="Daemon socket path (default: per-user path in the runtime dir)")
+    parser.add_argument("--cache", metavar="DIR",
+                        help="Build cache directory; files whose output is up to date are skipped "
+                             "(with --stream only the fragment cache is used)")
+    parser.add_argument("--fragment-cache", action="store_true",
+                        help="With --cache, also cache rendered blocks so edits re-render only changed blocks")
     
     args = parser.parse_args()
+    if args.daemon:
+        try:
+            run_daemon(args.socket or default_socket_path(), args.jobs or 1)
+        except (OSError, RuntimeError) as e:
+            print(f"Error: {e}")
+            return 1
+        return 0
+    if not args.input:
+        parser.error("the following arguments are required: input")
     
     try:
-        converter = MarkdownConverter()
+        if args.watch or args.serve is not None:
+            if args.output and len(args.input) == 1:
+                input_path = Path(args.input[0])
+                if not input_path.is_file():
+                    raise FileNotFoundError(f"Input file not found: {input_path}")
+                plan_inputs = partial(list, [(input_path, Path(args.output))])
+            else:
+                plan_inputs = partial(plan_outputs, args.input, args.output_dir)
+            watch(plan_inputs, args.serve, args.debounce)
+            return 0
+        
+        if len(args.input) > 1 or args.output_dir or not Path(args.input[0]).is_file():
+            if args.output:
+                parser.error("-o/--output takes a single input file; use --output-dir for batch mode")
+            failures = convert_batch(args.input, args.output_dir, args.jobs, args.chunksize,
+                                     args.cache, args.fragment_cache)
+            return 1 if failures else 0
+
+        cache = BuildCache(args.cache) if args.cache else None
+        fragment_cache = FragmentCache(cache.fragments_path) if cache is not None and args.fragment_cache else None
+        converter = MarkdownConverter(fragment_cache)
         
-        input_path = Path(args.input)
+        input_path = Path(args.input[0])
         output_path = args.output if args.output else input_path.with_suffix('.html')
         
-        converter.convert_file(input_path, output_path)
+        if args.stream:
+            if not input_path.exists():
+                raise FileNotFoundError(f"Input file not found: {input_path}")
+            with open(input_path, 'r', encoding='utf-8') as reader, \
+                    open(output_path, 'w', encoding='utf-8', buffering=1 << 20) as writer:
+                converter.convert_stream(reader, writer, title=input_path.stem)
+            print(f"HTML file created: {output_path}")
+        else:
+            converter.convert_file(input_path, output_path, cache)
+        
+        if cache is not None:
+            cache.save()
+        if fragment_cache is not None:
+            fragment_cache.close()
         
     except FileNotFoundError as e:
         print(f"Error: {e}")
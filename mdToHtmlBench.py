@@ -0,0 +1,458 @@
+#!/usr/bin/env python3
+"""
+Markdown to HTML Benchmark - Measure MarkdownConverter speed and check its output
+
+Suites (all run by default, results printed as JSON):
+    inline        cost per KiB of the inline scanner at several markup densities
+    tables        tables of growing size streamed through convert_stream, to
+                  show linear time and flat memory
+    corpora       synthetic documents (prose, deep lists, huge tables, long
+                  code blocks, runs of asterisks, a mix): MB/s, peak memory,
+                  cost per block, and agreement between convert(),
+                  convert_stream() and LiveDocument
+    backtracking  pathological inputs at n and 4n: time must grow linearly
+    conformance   golden outputs from mdToHtmlGolden.json
+
+The exit status is 1 if a conformance case fails, the conversion paths
+disagree or an input scales superlinearly.
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tracemalloc
+from typing import Callable, Dict, Iterator, List
+
+from mdToHtml import LiveDocument, MarkdownConverter
+
+GOLDEN_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mdToHtmlGolden.json")
+
+# Time ratio between inputs of size 4n and n above which growth counts as
+# superlinear: linear growth gives about 4, quadratic about 16
+SUPERLINEAR_RATIO = 8.0
+
+WORDS = ("lorem", "ipsum", "dolor", "sit", "amet", "consectetur", "adipiscing", "elit",
+         "sed", "do", "eiusmod", "tempor", "incididunt", "ut", "labore", "et", "dolore")
+
+# Inline spans mixed into the text, by markup density
+SPANS = {
+    "plain": (),
+    "emphasis": ("**{0}**", "*{0}*", "***{0}***"),
+    "code": ("`{0}`", "``{0} ` {0}``", "`**{0}**`"),
+    "links": ("[{0}](https://example.com/{0})", "![{0}](img/{0}.png)", "[**{0}** `{0}`](#{0})"),
+    "mixed": ("**{0}**", "*{0}*", "`{0}`", "[{0}](https://example.com/{0})", "![{0}](img/{0}.png)"),
+}
+
+
+def make_text(rng: random.Random, kind: str, size: int, density: float) -> str:
+    """
+    Build one paragraph of about `size` characters
+
+    Args:
+        rng: Random number generator
+        kind: Key of SPANS choosing the markup mixed in
+        size: Target length in characters
+        density: Fraction of words wrapped in a span
+    """
+    spans = SPANS[kind]
+    words: List[str] = []
+    length = 0
+    while length < size:
+        word = rng.choice(WORDS)
+        if spans and rng.random() < density:
+            word = rng.choice(spans).format(word)
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words)
+
+
+def bench_inline(converter: MarkdownConverter, texts: List[str], repeat: int) -> Dict:
+    """
+    Time the inline scanner over a set of paragraphs
+
+    Args:
+        converter: Converter under test
+        texts: Paragraphs to format
+        repeat: Number of timed runs; the fastest one is reported
+
+    Returns:
+        Dictionary of metrics
+    """
+    convert_inline = converter._convert_inline
+    total_kib = sum(len(text) for text in texts) / 1024
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in texts:
+            convert_inline(text)
+        best = min(best, time.perf_counter() - start)
+    return {
+        "kib": round(total_kib, 1),
+        "seconds": round(best, 6),
+        "us_per_kib": round(best / total_kib * 1e6, 2) if total_kib else None,
+    }
+
+
+class CountingWriter:
+    """A writer that discards its input and only counts characters"""
+
+    def __init__(self):
+        self.chars = 0
+
+    def write(self, text: str):
+        self.chars += len(text)
+
+
+def table_lines(rows: int, columns: int) -> Iterator[str]:
+    """
+    Generate the lines of a pipe table lazily, so the input takes no memory
+
+    Args:
+        rows: Number of body rows
+        columns: Number of columns
+    """
+    yield "| " + " | ".join(f"column {c}" for c in range(columns)) + " |\n"
+    yield "|" + "|".join(("---", ":--:", "--:")[c % 3] for c in range(columns)) + "|\n"
+    for r in range(rows):
+        yield "| " + " | ".join(f"{r * columns + c}" if c % 4 else f"**row {r}**" for c in range(columns)) + " |\n"
+
+
+def bench_table(converter: MarkdownConverter, rows: int, columns: int) -> Dict:
+    """
+    Stream one generated table through convert_stream
+
+    The run is timed without tracing, then repeated under tracemalloc to get
+    the peak memory allocated during conversion.
+
+    Args:
+        converter: Converter under test
+        rows: Number of body rows
+        columns: Number of columns
+
+    Returns:
+        Dictionary of metrics
+    """
+    writer = CountingWriter()
+    start = time.perf_counter()
+    converter.convert_stream(table_lines(rows, columns), writer)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    converter.convert_stream(table_lines(rows, columns), CountingWriter())
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "rows": rows,
+        "columns": columns,
+        "seconds": round(elapsed, 6),
+        "us_per_row": round(elapsed / rows * 1e6, 2) if rows else None,
+        "html_chars": writer.chars,
+        "peak_traced_bytes": peak,
+    }
+
+
+def corpus_prose(rng: random.Random, size: int) -> str:
+    """Paragraphs with mixed inline markup"""
+    parts = []
+    while size > 0:
+        parts.append(make_text(rng, "mixed", rng.randint(200, 800), 0.2))
+        size -= len(parts[-1]) + 2
+    return "\n\n".join(parts)
+
+
+def corpus_deep_lists(rng: random.Random, size: int) -> str:
+    """Long lists with indented items and continuation lines"""
+    lines = []
+    while size > 0:
+        depth = rng.randint(0, 8)
+        marker = rng.choice(("-", "*", "+", f"{rng.randint(1, 99)}."))
+        lines.append("  " * depth + f"{marker} " + make_text(rng, "mixed", rng.randint(20, 120), 0.2))
+        if rng.random() < 0.3:
+            lines.append("  " * (depth + 1) + make_text(rng, "plain", 60, 0))
+        if rng.random() < 0.05:
+            lines.append("")
+        size -= sum(len(line) + 1 for line in lines[-2:])
+    return "\n".join(lines)
+
+
+def corpus_tables(rng: random.Random, size: int, columns: int = 6) -> str:
+    """One huge table with alignments and inline markup in cells"""
+    lines = list(table_lines(0, columns))
+    row = 0
+    while size > 0:
+        cells = [make_text(rng, "mixed", 12, 0.2) for _ in range(columns)]
+        lines.append(f"| {row} | " + " | ".join(cells[1:]) + " |\n")
+        size -= len(lines[-1])
+        row += 1
+    return "".join(lines)
+
+
+def corpus_code(rng: random.Random, size: int) -> str:
+    """Long fenced code blocks whose content looks like markup"""
+    blocks = []
+    while size > 0:
+        body = "\n".join(f"    x = {n} ** 2  # *not* `markup` <tag> & [link](url)"
+                         for n in range(rng.randint(50, 400)))
+        blocks.append(f"```python\n{body}\n```")
+        size -= len(blocks[-1]) + 2
+    return "\n\n".join(blocks)
+
+
+def corpus_star_runs(rng: random.Random, size: int) -> str:
+    """Paragraphs full of unbalanced and ambiguous asterisk runs"""
+    pieces = ("*", "**", "***", "a*", "*a", " * ", "**a*", "*a**", "a** b", "[", "`")
+    parts = []
+    while size > 0:
+        parts.append(" ".join(rng.choice(pieces) + rng.choice(WORDS) for _ in range(rng.randint(20, 200))))
+        size -= len(parts[-1]) + 2
+    return "\n\n".join(parts)
+
+
+def corpus_mixed(rng: random.Random, size: int) -> str:
+    """A document mixing every construct"""
+    parts = []
+    builders = (corpus_prose, corpus_deep_lists, corpus_tables, corpus_code)
+    while size > 0:
+        parts.append(f"# Section {len(parts)}")
+        parts.append(rng.choice(builders)(rng, 4096))
+        parts.append("> " + make_text(rng, "mixed", 200, 0.2))
+        parts.append("---")
+        size -= sum(len(part) + 2 for part in parts[-4:])
+    return "\n\n".join(parts)
+
+
+CORPORA: Dict[str, Callable[[random.Random, int], str]] = {
+    "prose": corpus_prose,
+    "deep_lists": corpus_deep_lists,
+    "tables": corpus_tables,
+    "code": corpus_code,
+    "star_runs": corpus_star_runs,
+    "mixed": corpus_mixed,
+}
+
+
+def bench_corpus(converter: MarkdownConverter, markdown: str, repeat: int) -> Dict:
+    """
+    Convert one document and check that every conversion path agrees
+
+    Args:
+        converter: Converter under test
+        markdown: The document
+        repeat: Number of timed runs; the fastest one is reported
+
+    Returns:
+        Dictionary of metrics
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        html = converter.convert(markdown)
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    converter.convert(markdown)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    blocks = sum(1 for _ in converter.parse(markdown.splitlines()))
+    stream = io.StringIO()
+    converter.convert_stream(io.StringIO(markdown), stream)
+    streamed = stream.getvalue()
+    streamed_body = streamed[streamed.index("<body>\n") + 7:streamed.rindex("\n</body>")]
+    size = len(markdown.encode("utf-8"))
+    return {
+        "kib": round(size / 1024, 1),
+        "seconds": round(best, 6),
+        "mb_per_sec": round(size / best / 1e6, 2) if best else None,
+        "blocks": blocks,
+        "us_per_block": round(best / blocks * 1e6, 2) if blocks else None,
+        "peak_traced_bytes": peak,
+        "peak_per_input_byte": round(peak / size, 2) if size else None,
+        "paths_agree": streamed_body == html and LiveDocument(converter).render(markdown) == html,
+    }
+
+
+# Inputs built to defeat backtracking or nearest-match searches, by size n
+PATHOLOGICAL: Dict[str, Callable[[int], str]] = {
+    "unclosed_strong": lambda n: "**a " * n,
+    "closers_without_openers": lambda n: "a* " * n,
+    "openers_then_closers": lambda n: "*a " * n + "b* " * n,
+    "long_star_runs": lambda n: "*" * (3 * n) + " a " + "*" * n,
+    "unclosed_code_spans": lambda n: "``a `b " * n,
+    "unclosed_links": lambda n: "[a *b " * n,
+    "link_closers_without_openers": lambda n: "a* " * n + "](u) " * n,
+    "unclosed_images": lambda n: "![a " * n,
+    "nested_brackets": lambda n: "[" * n + "a" + "](u)" * n,
+    # No spaces: nothing but the next opener ends a failed URL or code span scan.
+    # A single backtick run is scaled down since backtracking on it is cubic
+    "backtick_run": lambda n: "a" + "`" * (n // 8),
+    "unclosed_image_urls": lambda n: "![a](" * n,
+    "unclosed_link_urls": lambda n: "[a](b" * n,
+    "unclosed_hrefs": lambda n: "[" + "](" * n,
+}
+
+# A timed run slower than this is not repeated
+SLOW_RUN_SECONDS = 1.0
+
+
+def bench_backtracking(converter: MarkdownConverter, n: int, repeat: int) -> Dict:
+    """
+    Time the inline scanner on each pathological input at size n and 4n
+
+    Returns:
+        Dictionary of metrics per input, with a "superlinear" flag
+    """
+    results = {}
+    for name, build in PATHOLOGICAL.items():
+        timings = []
+        for size in (n, 4 * n):
+            text = build(size)
+            best = float("inf")
+            for _ in range(repeat):
+                start = time.perf_counter()
+                converter._convert_inline(text)
+                best = min(best, time.perf_counter() - start)
+                if best > SLOW_RUN_SECONDS:
+                    break
+            timings.append(best)
+        ratio = timings[1] / timings[0] if timings[0] else 0.0
+        results[name] = {
+            "seconds_n": round(timings[0], 6),
+            "seconds_4n": round(timings[1], 6),
+            "ratio": round(ratio, 2),
+            "superlinear": ratio > SUPERLINEAR_RATIO,
+        }
+    return results
+
+
+def load_golden(path: str = GOLDEN_FILE) -> List[Dict]:
+    """Golden cases: a list of {"name", "markdown", "html"}"""
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def check_conformance(converter: MarkdownConverter, cases: List[Dict]) -> Dict:
+    """
+    Convert every golden case and compare with its expected HTML
+
+    Returns:
+        Counts, plus the expected and actual output of each failing case
+    """
+    failures = []
+    for case in cases:
+        html = converter.convert(case["markdown"])
+        if html != case["html"]:
+            failures.append({"name": case["name"], "expected": case["html"], "actual": html})
+    return {"cases": len(cases), "passed": len(cases) - len(failures), "failures": failures}
+
+
+def update_golden(converter: MarkdownConverter, path: str = GOLDEN_FILE) -> int:
+    """Rewrite the expected outputs from the current converter; review the diff before committing"""
+    cases = load_golden(path)
+    for case in cases:
+        case["html"] = converter.convert(case["markdown"])
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(cases, f, indent=2)
+        f.write("\n")
+    return len(cases)
+
+
+SUITES = ("inline", "tables", "corpora", "backtracking", "conformance")
+
+
+def run_benchmark(args) -> Dict:
+    """Run the selected suites and return the report"""
+    rng = random.Random(args.seed)
+    converter = MarkdownConverter()
+    report = {
+        "config": {
+            "suites": args.suites,
+            "kib": args.kib,
+            "paragraph_size": args.paragraph_size,
+            "density": args.density,
+            "repeat": args.repeat,
+            "seed": args.seed,
+            "table_rows": args.table_rows,
+            "table_columns": args.table_columns,
+            "corpus_kib": args.corpus_kib,
+            "backtracking_n": args.backtracking_n,
+        },
+        "python": sys.version.split()[0],
+    }
+
+    if "inline" in args.suites:
+        paragraphs = max(1, args.kib * 1024 // args.paragraph_size)
+        results = {}
+        for kind in SPANS:
+            texts = [make_text(rng, kind, args.paragraph_size, args.density) for _ in range(paragraphs)]
+            results[kind] = bench_inline(converter, texts, args.repeat)
+        report["inline"] = results
+
+    if "tables" in args.suites:
+        report["tables"] = [bench_table(converter, rows, args.table_columns) for rows in args.table_rows]
+
+    if "corpora" in args.suites:
+        report["corpora"] = {name: bench_corpus(converter, build(rng, args.corpus_kib * 1024), args.repeat)
+                             for name, build in CORPORA.items()}
+
+    if "backtracking" in args.suites:
+        report["backtracking"] = bench_backtracking(converter, args.backtracking_n, args.repeat)
+
+    if "conformance" in args.suites:
+        report["conformance"] = check_conformance(converter, load_golden())
+
+    return report
+
+
+def report_failed(report: Dict) -> bool:
+    """Whether the report shows a correctness or scaling problem"""
+    return (bool(report.get("conformance", {}).get("failures"))
+            or any(not corpus["paths_agree"] for corpus in report.get("corpora", {}).values())
+            or any(result["superlinear"] for result in report.get("backtracking", {}).values()))
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Benchmark MarkdownConverter on synthetic text")
+    parser.add_argument("--kib", type=int, default=512, help="KiB of text per markup kind")
+    parser.add_argument("--paragraph-size", type=int, default=400, help="Characters per paragraph")
+    parser.add_argument("--density", type=float, default=0.2, help="Fraction of words carrying markup")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs; the fastest is reported")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the text")
+    parser.add_argument("--table-rows", type=lambda value: [int(n) for n in value.split(",")],
+                        default=[1000, 10000, 100000], help="Comma-separated table sizes, in rows")
+    parser.add_argument("--table-columns", type=int, default=6, help="Columns per table")
+    parser.add_argument("--suites", type=lambda value: value.split(","), default=list(SUITES),
+                        help=f"Comma-separated suites to run (default: all of {','.join(SUITES)})")
+    parser.add_argument("--corpus-kib", type=int, default=1024, help="KiB per synthetic corpus")
+    parser.add_argument("--backtracking-n", type=int, default=2000, help="Base size of the pathological inputs")
+    parser.add_argument("--update-golden", action="store_true",
+                        help="Rewrite the golden outputs from the current converter and exit")
+    parser.add_argument("-o", "--output", help="Write the JSON report to this file instead of stdout")
+
+    args = parser.parse_args()
+    unknown = set(args.suites) - set(SUITES)
+    if unknown:
+        parser.error(f"unknown suite(s): {', '.join(sorted(unknown))}")
+
+    if args.update_golden:
+        print(f"Updated {update_golden(MarkdownConverter())} golden case(s) in {GOLDEN_FILE}")
+        return 0
+
+    report = run_benchmark(args)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 1 if report_failed(report) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
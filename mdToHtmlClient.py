@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Markdown to HTML Client - Convert through a running mdToHtml daemon
+
+Sends conversion requests to `mdToHtml.py --daemon` over a Unix domain
+socket, so each call skips interpreter warm-up and converter setup. When no
+daemon is running, falls back to converting in-process. This module only
+imports the standard library modules it needs to talk to the socket; the
+converter itself is imported on fallback.
+"""
+
+import os
+import sys
+import json
+import socket
+import argparse
+import tempfile
+from pathlib import Path
+from typing import Dict, Optional
+
+
+def default_socket_path() -> str:
+    """Per-user socket path shared by the daemon and its clients"""
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    return os.path.join(runtime_dir, f"mdToHtml-{os.getuid()}.sock")
+
+
+class DaemonClient:
+    """
+    Client for the mdToHtml conversion daemon
+
+    Keeps one connection open across requests. Requests and responses are
+    single lines of JSON. If the daemon cannot be reached, requests are
+    served by an in-process MarkdownConverter instead.
+    """
+
+    def __init__(self, socket_path: Optional[str] = None, fallback: bool = True):
+        """
+        Args:
+            socket_path: Path of the daemon's socket (default: default_socket_path())
+            fallback: Convert in-process when the daemon is not running
+        """
+        self.socket_path = socket_path or default_socket_path()
+        self.fallback = fallback
+        self.sock: Optional[socket.socket] = None
+        self.reader = None
+        self.converter = None
+
+    def _connect(self) -> bool:
+        if self.sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                sock.connect(self.socket_path)
+            except OSError:
+                sock.close()
+                return False
+            self.sock = sock
+            self.reader = sock.makefile("rb")
+        return True
+
+    def request(self, message: Dict) -> Dict:
+        """
+        Send one request and wait for its response
+
+        Args:
+            message: Request, see mdToHtml.handle_request()
+
+        Returns:
+            Response dictionary
+        """
+        if self._connect():
+            try:
+                self.sock.sendall(json.dumps(message).encode("utf-8") + b"\n")
+                line = self.reader.readline()
+                if line:
+                    return json.loads(line)
+            except OSError:
+                pass
+            # The daemon went away mid-request
+            self.close()
+        if not self.fallback:
+            raise ConnectionError(f"mdToHtml daemon not reachable at {self.socket_path}")
+        # Imported only now: the converter is much heavier to load than this client
+        import mdToHtml
+        if self.converter is None:
+            self.converter = mdToHtml.MarkdownConverter()
+        return mdToHtml.handle_request(message, self.converter)
+
+    def convert(self, markdown: str, title: Optional[str] = None) -> str:
+        """
+        Convert Markdown text
+
+        Args:
+            markdown: Markdown text
+            title: If given, return a full HTML document with this title instead of a fragment
+
+        Returns:
+            HTML text
+        """
+        message = {"markdown": markdown}
+        if title is not None:
+            message["title"] = title
+        return self._result(self.request(message))["html"]
+
+    def convert_file(self, input_file, output_file=None) -> str:
+        """
+        Convert a Markdown file to an HTML document on disk
+
+        Args:
+            input_file: Path to the Markdown file
+            output_file: Path to the output HTML file (default: input file with .html extension)
+
+        Returns:
+            Path of the output file
+        """
+        message = {"path": os.path.abspath(input_file)}
+        if output_file:
+            message["output"] = os.path.abspath(output_file)
+        return self._result(self.request(message))["output"]
+
+    @staticmethod
+    def _result(response: Dict) -> Dict:
+        if "error" in response:
+            raise RuntimeError(response["error"])
+        return response
+
+    def close(self):
+        if self.sock is not None:
+            self.reader.close()
+            self.sock.close()
+            self.sock = None
+            self.reader = None
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Convert Markdown to HTML through the mdToHtml daemon")
+    parser.add_argument("input", nargs="+", help="Input Markdown file(s), or - to convert stdin to stdout")
+    parser.add_argument("-o", "--output", help="Output HTML file, for a single input")
+    parser.add_argument("--socket", help="Daemon socket path (default: per-user path in the runtime dir)")
+
+    args = parser.parse_args()
+    if args.output and len(args.input) > 1:
+        parser.error("-o/--output takes a single input file")
+
+    client = DaemonClient(args.socket)
+    try:
+        for item in args.input:
+            if item == "-":
+                sys.stdout.write(client.convert(sys.stdin.read(), title=""))
+                continue
+            if not Path(item).is_file():
+                print(f"Error: Input file not found: {item}")
+                return 1
+            print(f"HTML file created: {client.convert_file(item, args.output)}")
+    except RuntimeError as e:
+        print(f"Error: {e}")
+        return 1
+    finally:
+        client.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
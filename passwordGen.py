@@ -6,20 +6,205 @@ Secure random password generator:
 - User specifies length
 - User can include uppercase, lowercase, digits, special characters
 - Ensures each generated password is unique during the program session
-- Uses only standard library (secrets, string)
+  (tracked as keyed digests, never as plaintext; see KeyedDigestSet and BloomFilter)
+- Uses only standard library (secrets, string); NumPy speeds up bulk generation if installed
 - Optionally enforces at least one character from each selected category
+- generate_passwords() creates many passwords at once from large blocks of random bytes
+- PasswordPolicy describes richer rules (minimum counts per class, no ambiguous characters,
+  no repeated runs, banned substrings, forbidden prefixes); generate_policy_passwords()
+  follows them directly instead of filtering random passwords
+
+Run without arguments for the interactive prompts, or non-interactively, e.g.
+    python passwordGen.py --count 1000000 --length 16 --format csv --out passwords.csv
+which generates in parallel worker processes and writes a file only the owner can read.
 """
 
+import argparse
+import csv
+import io
+import json
+import math
+import multiprocessing
+import os
+import queue
+import re
 import secrets
 import string
 import sys
+from array import array
+from bisect import bisect_right
+from functools import lru_cache
+from hashlib import blake2b
+from itertools import accumulate, combinations
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Tuple
 
-# Set of previously generated passwords (session-unique)
-_generated_passwords = set()
+try:
+    import numpy as np
+except ImportError:  # optional: only used to vectorize bulk generation
+    np = None
 
 # Default special characters
 DEFAULT_SPECIALS = "!@#$%^&*()-_=+[]{}|;:,.<>?/`~"
 
+# Characters easily confused with one another, left out by PasswordPolicy(exclude_ambiguous=True)
+AMBIGUOUS_CHARS = "Il1|O0o`'\""
+
+# Random bytes drawn at a time by the bulk generator
+ENTROPY_BLOCK_BYTES = 1 << 16
+
+# Once fewer than 1/EXHAUSTION_RATIO of the possible passwords are left, random
+# retries get expensive and generation switches to walking a permutation instead
+EXHAUSTION_RATIO = 16
+
+class KeyedDigestSet:
+    """
+    Set of previously generated passwords, stored as 8-byte keyed BLAKE2 digests.
+
+    The key is random per instance (per session), so the digests cannot be checked
+    against guessed passwords once the session is over. Digests live in an
+    open-addressing array('Q') table kept between 53% and 80% full, i.e. 10-15
+    bytes per password. Two different passwords sharing a 64-bit digest only
+    makes the generator reject a fresh password, never accept a duplicate.
+    """
+
+    _MAX_LOAD = 0.8
+    _GROWTH = 1.5
+
+    def __init__(self, capacity: int = 1024):
+        self._hasher = blake2b(key=secrets.token_bytes(32), digest_size=8)
+        self._used = 0
+        self._allocate(max(int(capacity / self._MAX_LOAD) + 1, 8))
+
+    def _allocate(self, size: int):
+        self._table = array("Q", bytes(8 * size))
+        self._grow_at = int(size * self._MAX_LOAD)
+
+    def __len__(self) -> int:
+        return self._used
+
+    def _digest(self, password: str) -> int:
+        hasher = self._hasher.copy()
+        hasher.update(password.encode("utf-8"))
+        # 0 marks an empty slot
+        return int.from_bytes(hasher.digest(), "little") or 1
+
+    def _slot(self, digest: int) -> int:
+        # index of digest in the table, or of the empty slot where it would go
+        table = self._table
+        size = len(table)
+        i = digest % size
+        while True:
+            value = table[i]
+            if value == digest or value == 0:
+                return i
+            i += 1
+            if i == size:
+                i = 0
+
+    def __contains__(self, password: str) -> bool:
+        return self._table[self._slot(self._digest(password))] != 0
+
+    def add(self, password: str) -> bool:
+        """Record password; return False if it was already recorded."""
+        digest = self._digest(password)
+        i = self._slot(digest)
+        if self._table[i]:
+            return False
+        self._table[i] = digest
+        self._used += 1
+        if self._used > self._grow_at:
+            self._resize(int(len(self._table) * self._GROWTH))
+        return True
+
+    def _resize(self, size: int):
+        old = self._table
+        self._allocate(size)
+        for digest in old:
+            if digest:
+                self._table[self._slot(digest)] = digest
+
+    def clear(self):
+        self._allocate(len(self._table))
+        self._used = 0
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._table) * self._table.itemsize
+
+class BloomFilter:
+    """
+    Probabilistic set of previously generated passwords with a fixed memory budget.
+
+    Sized for `capacity` passwords at the given false-positive rate (about 29 bits,
+    under 4 bytes, per password at the default 1e-6). A false positive makes the
+    generator reject a fresh password, so duplicates are still never returned;
+    past `capacity` the false-positive rate, and with it the rejection rate, rises.
+    Bit positions come from a keyed BLAKE2 digest by double hashing.
+    """
+
+    def __init__(self, capacity: int, false_positive_rate: float = 1e-6):
+        if capacity <= 0:
+            raise ValueError("Bloom filter capacity must be positive.")
+        if not 0 < false_positive_rate < 1:
+            raise ValueError("False-positive rate must be between 0 and 1.")
+        self.capacity = capacity
+        self.false_positive_rate = false_positive_rate
+        self._bits = max(int(-capacity * math.log(false_positive_rate) / math.log(2) ** 2), 8)
+        self._hashes = max(round(self._bits / capacity * math.log(2)), 1)
+        self._hasher = blake2b(key=secrets.token_bytes(32), digest_size=16)
+        self._array = bytearray((self._bits + 7) // 8)
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _positions(self, password: str):
+        hasher = self._hasher.copy()
+        hasher.update(password.encode("utf-8"))
+        digest = int.from_bytes(hasher.digest(), "little")
+        h1, h2 = digest >> 64, digest & 0xFFFFFFFFFFFFFFFF | 1
+        bits = self._bits
+        return [(h1 + i * h2) % bits for i in range(self._hashes)]
+
+    def __contains__(self, password: str) -> bool:
+        array_ = self._array
+        return all(array_[p >> 3] & (1 << (p & 7)) for p in self._positions(password))
+
+    def add(self, password: str) -> bool:
+        """Record password; return False if it was (possibly) recorded already."""
+        array_ = self._array
+        new = False
+        for p in self._positions(password):
+            mask = 1 << (p & 7)
+            if not array_[p >> 3] & mask:
+                array_[p >> 3] |= mask
+                new = True
+        if new:
+            self._count += 1
+        return new
+
+    def clear(self):
+        self._array = bytearray(len(self._array))
+        self._count = 0
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._array)
+
+# Previously generated passwords (session-unique); see set_uniqueness_backend()
+_generated_passwords = KeyedDigestSet()
+
+def set_uniqueness_backend(backend) -> None:
+    """
+    Replace the store used to keep passwords unique within the session, e.g. with
+    BloomFilter(capacity=50_000_000) to bound memory for very large runs. The backend
+    needs add(password) -> bool (False if already seen), __contains__, __len__ and clear().
+    """
+    global _generated_passwords
+    _generated_passwords = backend
+    _issued.clear()
+    _walks.clear()
+
 def build_charset(use_upper: bool, use_lower: bool, use_digits: bool, use_special: bool, special_chars: str = DEFAULT_SPECIALS):
     parts = []
     if use_upper:
@@ -37,20 +222,135 @@ def possible_combinations_count(charset_len: int, length: int):
     # returns number of possible different passwords (int) = charset_len ** length
     return charset_len ** length
 
-def generate_password(length: int,
-                      use_upper: bool = True,
-                      use_lower: bool = True,
-                      use_digits: bool = True,
-                      use_special: bool = True,
-                      enforce_each_category: bool = True,
-                      special_chars: str = DEFAULT_SPECIALS,
-                      max_attempts: int = 10000) -> str:
+@lru_cache(maxsize=256)
+def count_passwords(parts: Tuple[str, ...], length: int, enforce_each_category: bool = True) -> int:
     """
-    Generate a secure random password with given options.
-    Ensures uniqueness within this program session by checking _generated_passwords.
-    If enforce_each_category is True, the password will include at least one char
-    from each selected category (if possible given length).
+    Exact number of distinct passwords of the given length over the categories in
+    `parts` (a tuple, as build_charset() returns it, for caching). With
+    enforce_each_category, counts only those using every category, by
+    inclusion-exclusion over the categories left out; overlapping categories and
+    repeated characters are handled by counting distinct characters.
+    """
+    alphabet = set("".join(parts))
+    if not enforce_each_category:
+        return len(alphabet) ** length
+    total = 0
+    for excluded in range(len(parts) + 1):
+        for left_out in combinations(parts, excluded):
+            allowed = alphabet.difference(*left_out)
+            total += (-1) ** excluded * len(allowed) ** length
+    return total
+
+class IndexPermutation:
+    """
+    Keyed pseudorandom permutation of range(size).
+
+    A balanced Feistel network with keyed BLAKE2 round functions permutes the
+    smallest even-width bit range covering size; values that land outside
+    range(size) are fed through again (cycle-walking), which takes under four
+    passes on average.
+    """
+
+    ROUNDS = 8
+
+    def __init__(self, size: int):
+        if size <= 0:
+            raise ValueError("Permutation size must be positive.")
+        self.size = size
+        bits = max((size - 1).bit_length(), 2)
+        self._half = (bits + 1) // 2
+        self._mask = (1 << self._half) - 1
+        self._width = (self._half + 7) // 8
+        self._hasher = blake2b(key=secrets.token_bytes(32), digest_size=min(self._width, 64))
+
+    def _round(self, number: int, value: int) -> int:
+        hasher = self._hasher.copy()
+        hasher.update(bytes((number,)) + value.to_bytes(self._width, "little"))
+        return int.from_bytes(hasher.digest(), "little") & self._mask
+
+    def __getitem__(self, index: int) -> int:
+        if not 0 <= index < self.size:
+            raise IndexError("permutation index out of range")
+        half, mask = self._half, self._mask
+        value = index
+        while True:
+            left, right = value >> half, value & mask
+            for number in range(self.ROUNDS):
+                left, right = right, left ^ self._round(number, right)
+            value = (left << half) | right
+            if value < self.size:
+                return value
+
+class _PermutationWalk:
+    # visits every password of one configuration once, in keyed pseudorandom order
+
+    def __init__(self, parts: Tuple[str, ...], length: int, enforce_each_category: bool):
+        self.alphabet = "".join(dict.fromkeys("".join(parts)))
+        self.length = length
+        self.required = [frozenset(part) for part in parts] if enforce_each_category else []
+        self.permutation = IndexPermutation(len(self.alphabet) ** length)
+        self.position = 0
+
+    def password(self, index: int) -> str:
+        base = len(self.alphabet)
+        chars = []
+        for _ in range(self.length):
+            index, digit = divmod(index, base)
+            chars.append(self.alphabet[digit])
+        return "".join(chars)
+
+    def next_unseen(self) -> str:
+        """Next password in the walk not generated yet, or "" once the walk is complete."""
+        permutation = self.permutation
+        while self.position < permutation.size:
+            candidate = self.password(permutation[self.position])
+            self.position += 1
+            if self.required:
+                chars = set(candidate)
+                if any(chars.isdisjoint(part) for part in self.required):
+                    continue
+            if _generated_passwords.add(candidate):
+                return candidate
+        return ""
+
+# configuration -> passwords generated with it this session
+_issued: Dict[tuple, int] = {}
+
+# configuration -> walk in progress, for configurations close to exhaustion
+_walks: Dict[tuple, _PermutationWalk] = {}
+
+def reset_session() -> None:
+    """Forget all passwords generated so far in this session."""
+    _generated_passwords.clear()
+    _issued.clear()
+    _walks.clear()
+
+def _issued_count(config: tuple) -> int:
+    # passwords generated with config, capped by the store size in case the store was cleared directly
+    return min(_issued.get(config, 0), len(_generated_passwords))
+
+def _next_unseen(config: tuple) -> str:
+    """
+    Sample without replacement near exhaustion: take the next unseen password from
+    this configuration's permutation walk. A complete walk visits every possible
+    password, so this fails only when none are left; after a walk completes (e.g.
+    the session was cleared meanwhile) one fresh walk is tried before giving up.
     """
+    for _ in range(2):
+        walk = _walks.get(config)
+        if walk is None:
+            walk = _walks[config] = _PermutationWalk(*config)
+        candidate = walk.next_unseen()
+        if candidate:
+            _issued[config] = _issued.get(config, 0) + 1
+            return candidate
+        del _walks[config]
+    raise RuntimeError("No more unique passwords possible with the chosen length and charset (session exhausted).")
+
+def _checked_charset(length: int, use_upper: bool, use_lower: bool, use_digits: bool, use_special: bool,
+                     enforce_each_category: bool, special_chars: str) -> Tuple[str, list, tuple, int]:
+    # validate the options shared by generate_password and generate_passwords; return
+    # build_charset()'s result, the configuration key and the number of possible passwords
     if length <= 0:
         raise ValueError("Password length must be positive.")
 
@@ -58,16 +358,45 @@ def generate_password(length: int,
     if not charset:
         raise ValueError("At least one character class must be selected.")
 
-    # Quick exhaustion check: if total possible combinations <= number of generated passwords, we cannot create a new unique one.
-    total_possible = possible_combinations_count(len(charset), length)
-    if total_possible <= len(_generated_passwords):
-        raise RuntimeError("No more unique passwords possible with the chosen length and charset (session exhausted).")
-
     # If enforcing one-of-each-type, ensure length is sufficient
     required_types = len(parts)
     if enforce_each_category and length < required_types:
         raise ValueError(f"Length {length} is too short to include at least one character from each of the {required_types} selected categories.")
 
+    # Exhaustion check against the exact (cached) count: if every possible password was generated, we cannot create a new unique one.
+    config = (tuple(parts), length, enforce_each_category)
+    total_possible = count_passwords(*config)
+    if total_possible <= _issued_count(config):
+        raise RuntimeError("No more unique passwords possible with the chosen length and charset (session exhausted).")
+    return charset, parts, config, total_possible
+
+def _near_exhaustion(config: tuple, total_possible: int) -> bool:
+    # True once random retries would need EXHAUSTION_RATIO draws or more per new password.
+    # Passwords of other configurations that also fit this one are not counted; if they
+    # use up the space, the permutation walk still ends with the exhaustion error.
+    return (total_possible - _issued_count(config)) * EXHAUSTION_RATIO <= total_possible
+
+def generate_password(length: int,
+                      use_upper: bool = True,
+                      use_lower: bool = True,
+                      use_digits: bool = True,
+                      use_special: bool = True,
+                      enforce_each_category: bool = True,
+                      special_chars: str = DEFAULT_SPECIALS,
+                      max_attempts: int = 10000) -> str:
+    """
+    Generate a secure random password with given options.
+    Ensures uniqueness within this program session by recording it in _generated_passwords.
+    If enforce_each_category is True, the password will include at least one char
+    from each selected category (if possible given length).
+    Close to exhaustion, draws without replacement so it still succeeds in bounded
+    time until every possible password was generated.
+    """
+    charset, parts, config, total_possible = _checked_charset(length, use_upper, use_lower, use_digits, use_special,
+                                                              enforce_each_category, special_chars)
+    if _near_exhaustion(config, total_possible):
+        return _next_unseen(config)
+
     attempts = 0
     while True:
         attempts += 1
@@ -91,11 +420,581 @@ def generate_password(length: int,
         else:
             candidate = "".join(secrets.choice(charset) for _ in range(length))
 
-        if candidate not in _generated_passwords:
-            _generated_passwords.add(candidate)
+        if _generated_passwords.add(candidate):
+            _issued[config] = _issued.get(config, 0) + 1
             return candidate
         # else loop and try again
 
+def _byte_sampler(charset: str) -> Tuple[bytes, bytes]:
+    """
+    Build the bytes.translate() arguments that turn random bytes into charset characters.
+    A byte b below the largest multiple of len(charset) that fits in 256 maps to
+    charset[b % len(charset)]; bytes above it are deleted (rejection sampling), so
+    every character is exactly equally likely.
+    """
+    size = len(charset)
+    limit = 256 - 256 % size
+    table = bytes(ord(charset[b % size]) if b < limit else 0 for b in range(256))
+    rejected = bytes(range(limit, 256))
+    return table, rejected
+
+def _random_chars(charset: str, count: int, sampler: Tuple[bytes, bytes]) -> str:
+    # draw `count` uniformly random characters from charset, one large block of random bytes at a time
+    table, rejected = sampler
+    acceptance = (256 - len(rejected)) / 256
+    chunks = []
+    missing = count
+    while missing > 0:
+        # ask for a little more than the expected need so one block usually suffices
+        block = secrets.token_bytes(min(ENTROPY_BLOCK_BYTES, int(missing / acceptance * 1.05) + 16))
+        chars = block.translate(table, rejected)[:missing]
+        chunks.append(chars)
+        missing -= len(chars)
+    return b"".join(chunks).decode("latin-1")
+
+def _category_filter(parts: list, length: int):
+    """
+    Return a function that, given a string of concatenated candidates, yields those
+    containing at least one character of every category.
+    """
+    if np is not None:
+        # one boolean lookup table per category, indexed by character code
+        tables = []
+        for part in parts:
+            table = np.zeros(256, dtype=bool)
+            table[[ord(c) for c in part]] = True
+            tables.append(table)
+
+        def keep(chars: str):
+            grid = np.frombuffer(chars.encode("latin-1"), dtype=np.uint8).reshape(-1, length)
+            ok = np.ones(len(grid), dtype=bool)
+            for table in tables:
+                ok &= table[grid].any(axis=1)
+            for row in np.flatnonzero(ok).tolist():
+                yield chars[row * length:(row + 1) * length]
+        return keep
+
+    patterns = [re.compile("[" + re.escape(part) + "]") for part in parts]
+
+    def keep(chars: str):
+        for start in range(0, len(chars), length):
+            candidate = chars[start:start + length]
+            if all(pattern.search(candidate) for pattern in patterns):
+                yield candidate
+    return keep
+
+def generate_passwords(n: int,
+                       length: int,
+                       use_upper: bool = True,
+                       use_lower: bool = True,
+                       use_digits: bool = True,
+                       use_special: bool = True,
+                       enforce_each_category: bool = True,
+                       special_chars: str = DEFAULT_SPECIALS,
+                       max_attempts: int = 10000,
+                       first_chars: Optional[str] = None) -> List[str]:
+    """
+    Generate n secure random passwords at once, with the same options and guarantees as
+    generate_password(): each is unique within the session and, if enforce_each_category
+    is True, contains at least one character from each selected category.
+
+    Instead of one random draw per character, random bytes are read in large blocks and
+    mapped onto the charset with rejection sampling. Candidates missing a category are
+    discarded, so passwords are uniform over all valid ones.
+
+    first_chars restricts the first character to a subset of the charset, which splits
+    the password space into disjoint partitions (see export_passwords()). Such
+    partitions are not tracked for exhaustion; generation just fails after
+    max_attempts duplicates.
+    """
+    if n < 0:
+        raise ValueError("Number of passwords must not be negative.")
+    charset, parts, config, total_possible = _checked_charset(length, use_upper, use_lower, use_digits, use_special,
+                                                              enforce_each_category, special_chars)
+    if first_chars is not None and (not first_chars or not set(first_chars) <= set(charset)):
+        raise ValueError("First characters must be a non-empty subset of the charset.")
+    if max(map(ord, charset)) > 255 or len(charset) > 256:
+        if first_chars is not None:
+            raise ValueError("First characters can only be restricted for single-byte charsets.")
+        # the byte sampler needs single-byte characters; fall back to one draw per character
+        return [generate_password(length, use_upper, use_lower, use_digits, use_special,
+                                  enforce_each_category, special_chars, max_attempts) for _ in range(n)]
+
+    sampler = _byte_sampler(charset)
+    first_sampler = _byte_sampler(first_chars) if first_chars is not None else None
+    keep = _category_filter(parts, length) if enforce_each_category and len(parts) > 1 else None
+    passwords = []
+    acceptance = 1.0
+    failed = 0
+    while len(passwords) < n:
+        if first_sampler is None and _near_exhaustion(config, total_possible):
+            # few passwords left: take the rest without replacement
+            passwords.extend(_next_unseen(config) for _ in range(n - len(passwords)))
+            break
+        # candidates for this round, scaled by the share that passed the category check so far
+        wanted = n - len(passwords)
+        batch = min(max(int(wanted / acceptance * 1.1) + 1, 16), ENTROPY_BLOCK_BYTES // length + 1)
+        if first_sampler is None:
+            chars = _random_chars(charset, batch * length, sampler)
+        else:
+            firsts = _random_chars(first_chars, batch, first_sampler)
+            rest = _random_chars(charset, batch * (length - 1), sampler)
+            step = length - 1
+            chars = "".join([first + rest[i * step:(i + 1) * step] for i, first in enumerate(firsts)])
+        if keep is None:
+            candidates = [chars[i:i + length] for i in range(0, len(chars), length)]
+        else:
+            candidates = list(keep(chars))
+            acceptance = max(len(candidates) / batch, 0.01)
+        record = _generated_passwords.add
+        for candidate in candidates:
+            if not record(candidate):
+                failed += 1
+                if failed > max_attempts:
+                    raise RuntimeError("Failed to generate a unique password after many attempts. Try increasing length or altering charset.")
+                continue
+            passwords.append(candidate)
+            _issued[config] = _issued.get(config, 0) + 1
+            if len(passwords) == n or (first_sampler is None and _near_exhaustion(config, total_possible)):
+                break
+    return passwords
+
+class PasswordPolicy(NamedTuple):
+    """
+    Rules a generated password must follow. Compile once with compile_policy().
+
+    min_* is the minimum number of characters of each class, for the classes in use.
+    max_run limits runs of one repeated character (0: no limit, 1: no two equal
+    neighbours). banned_substrings (e.g. dictionary words) may not appear anywhere and
+    forbidden_prefixes may not start the password; both compare case-insensitively
+    unless ignore_case is False.
+    """
+    length: int
+    use_upper: bool = True
+    use_lower: bool = True
+    use_digits: bool = True
+    use_special: bool = True
+    min_upper: int = 1
+    min_lower: int = 1
+    min_digits: int = 1
+    min_special: int = 1
+    special_chars: str = DEFAULT_SPECIALS
+    exclude_ambiguous: bool = False
+    max_run: int = 0
+    banned_substrings: Tuple[str, ...] = ()
+    forbidden_prefixes: Tuple[str, ...] = ()
+    ignore_case: bool = True
+
+class SubstringMatcher:
+    """
+    Aho-Corasick automaton over a set of banned words.
+
+    Feeding a text one character at a time through step() reaches a state for which
+    matches() is True exactly when a banned word ends at that character, so a
+    generator can rule out the characters that would complete a word before drawing.
+    """
+
+    def __init__(self, words: Iterable[str]):
+        self._children: List[Dict[str, int]] = [{}]
+        self._fail = [0]
+        self._matches = [False]
+        for word in words:
+            state = 0
+            for ch in word:
+                nxt = self._children[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._children)
+                    self._children[state][ch] = nxt
+                    self._children.append({})
+                    self._fail.append(0)
+                    self._matches.append(False)
+                state = nxt
+            self._matches[state] = True
+        # failure links, breadth first; a state matches if any suffix of it is a word
+        queue = list(self._children[0].values())
+        for state in queue:
+            for ch, child in self._children[state].items():
+                fallback = self._fail[state]
+                while fallback and ch not in self._children[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._children[fallback].get(ch, 0)
+                self._fail[child] = target if target != child else 0
+                self._matches[child] = self._matches[child] or self._matches[self._fail[child]]
+                queue.append(child)
+        self._steps: Dict[Tuple[int, str], int] = {}
+
+    def step(self, state: int, ch: str) -> int:
+        key = (state, ch)
+        nxt = self._steps.get(key)
+        if nxt is None:
+            s = state
+            while s and ch not in self._children[s]:
+                s = self._fail[s]
+            nxt = self._steps[key] = self._children[s].get(ch, 0)
+        return nxt
+
+    def matches(self, state: int) -> bool:
+        return self._matches[state]
+
+    def search(self, text: str) -> bool:
+        """True if any banned word occurs in text."""
+        state = 0
+        for ch in text:
+            state = self.step(state, ch)
+            if self._matches[state]:
+                return True
+        return False
+
+class GenerationPlan:
+    """
+    A PasswordPolicy compiled for direct generation.
+
+    Holds the alphabet of each character class (disjoint, with ambiguous characters
+    removed), the banned substring matcher and a table counting, for every position
+    and generation state, how many valid passwords can still be completed from it.
+    The state is what the rules need to know about the characters drawn so far: the
+    class minimums still unmet, the matcher state, the forbidden prefix being spelled
+    and the last character's run. Characters of one class that occur in no banned word
+    or prefix behave alike and share a group, which keeps the table small.
+
+    generate() walks the table, drawing each next character with probability
+    proportional to the passwords it leaves possible, so every password that follows
+    the policy is equally likely and no candidate is ever rejected.
+    """
+
+    def __init__(self, policy: PasswordPolicy):
+        if policy.length <= 0:
+            raise ValueError("Password length must be positive.")
+        if policy.max_run < 0:
+            raise ValueError("Maximum run length must not be negative.")
+        specs = [(policy.use_upper, string.ascii_uppercase, policy.min_upper, "uppercase"),
+                 (policy.use_lower, string.ascii_lowercase, policy.min_lower, "lowercase"),
+                 (policy.use_digits, string.digits, policy.min_digits, "digit"),
+                 (policy.use_special, policy.special_chars, policy.min_special, "special")]
+        excluded = set(AMBIGUOUS_CHARS) if policy.exclude_ambiguous else set()
+        self.alphabets: List[str] = []
+        self.minimums: List[int] = []
+        for used, chars, minimum, name in specs:
+            if not used:
+                continue
+            if minimum < 0:
+                raise ValueError(f"Minimum {name} count must not be negative.")
+            # keep classes disjoint so counts per class are exact
+            alphabet = "".join(c for c in dict.fromkeys(chars) if c not in excluded and
+                               all(c not in other for other in self.alphabets))
+            if not alphabet:
+                if minimum:
+                    raise ValueError(f"No {name} characters left to satisfy the minimum.")
+                continue
+            self.alphabets.append(alphabet)
+            self.minimums.append(minimum)
+        if not self.alphabets:
+            raise ValueError("At least one character class must be selected.")
+        if sum(self.minimums) > policy.length:
+            raise ValueError(f"Length {policy.length} is too short for the minimum counts per character class.")
+        self.length = policy.length
+        self.max_run = policy.max_run
+        self.ignore_case = policy.ignore_case
+
+        fold = str.lower if policy.ignore_case else str
+        self._fold = fold
+        self._charset = "".join(self.alphabets)
+        words = [fold(w) for w in policy.banned_substrings if w]
+        self.matcher = SubstringMatcher(words)
+        if not all(policy.forbidden_prefixes):
+            raise ValueError("Forbidden prefixes must not be empty.")
+        self._prefixes = frozenset(fold(p) for p in policy.forbidden_prefixes)
+        self._stems = frozenset(p[:i] for p in self._prefixes for i in range(len(p)))
+
+        # (class, characters): one group per character named by a rule, one for the rest of each class
+        named = set("".join(words)) | set("".join(self._prefixes))
+        self._groups: List[Tuple[int, str]] = []
+        for i, alphabet in enumerate(self.alphabets):
+            self._groups += [(i, c) for c in alphabet if fold(c) in named]
+            rest = "".join(c for c in alphabet if fold(c) not in named)
+            if rest:
+                self._groups.append((i, rest))
+        self._moves: Dict[tuple, list] = {}
+        self._draws: Dict[tuple, tuple] = {}
+        self._start = (tuple(self.minimums), 0, "" if self._prefixes else None, -1, 0)
+        self._table = self._count_table()
+        if not self.count():
+            raise ValueError(f"No password of length {policy.length} follows the policy.")
+
+    def _next_states(self, state: tuple) -> list:
+        # (characters, group, repeats last, next state) for every draw the rules allow from state
+        moves = self._moves.get(state)
+        if moves is not None:
+            return moves
+        need, matched, stem, last, run = state
+        step, matches, fold = self.matcher.step, self.matcher.matches, self._fold
+        moves = []
+        for g, (label, chars) in enumerate(self._groups):
+            ch = fold(chars[0])
+            nxt_matched = step(matched, ch)
+            if matches(nxt_matched):
+                continue
+            nxt_stem = None
+            if stem is not None:
+                nxt_stem = stem + ch
+                if nxt_stem in self._prefixes:
+                    continue
+                if nxt_stem not in self._stems:
+                    nxt_stem = None
+            nxt_need = need
+            if need[label]:
+                nxt_need = need[:label] + (need[label] - 1,) + need[label + 1:]
+            if not self.max_run:
+                moves.append((len(chars), g, False, (nxt_need, nxt_matched, nxt_stem, -1, 0)))
+                continue
+            if g == last:
+                # drawing the last character again extends its run; any other one starts a new run
+                if run < self.max_run:
+                    moves.append((1, g, True, (nxt_need, nxt_matched, nxt_stem, g, run + 1)))
+                if len(chars) > 1:
+                    moves.append((len(chars) - 1, g, False, (nxt_need, nxt_matched, nxt_stem, g, 1)))
+            else:
+                moves.append((len(chars), g, False, (nxt_need, nxt_matched, nxt_stem, g, 1)))
+        self._moves[state] = moves
+        return moves
+
+    def _count_table(self) -> List[Dict[tuple, int]]:
+        # table[p][state]: valid ways to fill positions p.. from state, over the states reachable at p
+        layers = [{self._start}]
+        for position in range(self.length):
+            left = self.length - position - 1
+            layers.append({nxt for state in layers[-1] for _, _, _, nxt in self._next_states(state)
+                           if sum(nxt[0]) <= left})
+        table = [{state: int(not any(state[0])) for state in layers[-1]}]
+        for states in reversed(layers[:-1]):
+            after = table[-1]
+            table.append({state: sum(n * after.get(nxt, 0) for n, _, _, nxt in self._next_states(state))
+                          for state in states})
+        table.reverse()
+        return table
+
+    def count(self) -> int:
+        """Number of passwords following every rule of the policy."""
+        return self._table[0][self._start]
+
+    def generate(self) -> str:
+        """
+        Draw one password following the policy, uniformly among all such passwords
+        (not recorded for session uniqueness).
+        """
+        state = self._start
+        chars: List[str] = []
+        for position in range(self.length):
+            key = (position, state)
+            draw = self._draws.get(key)
+            if draw is None:
+                after = self._table[position + 1]
+                moves = [move + (after[move[3]],) for move in self._next_states(state) if after.get(move[3])]
+                bounds = list(accumulate(n * ways for n, _, _, _, ways in moves))
+                draw = self._draws[key] = (bounds, moves)
+            bounds, moves = draw
+            pick = secrets.randbelow(bounds[-1])
+            index = bisect_right(bounds, pick)
+            _, g, repeat, nxt, ways = moves[index]
+            group = self._groups[g][1]
+            if repeat:
+                ch = chars[-1]
+            else:
+                if g == state[3]:
+                    group = group.replace(chars[-1], "")
+                # the offset into this move is uniform below len(group) * ways
+                ch = group[(pick - (bounds[index - 1] if index else 0)) // ways]
+            chars.append(ch)
+            state = nxt
+        return "".join(chars)
+
+    def allows(self, password: str) -> bool:
+        """True if password follows every rule of the policy."""
+        if len(password) != self.length:
+            return False
+        for alphabet, minimum in zip(self.alphabets, self.minimums):
+            if sum(password.count(c) for c in alphabet) < minimum:
+                return False
+        if any(c not in self._charset for c in password):
+            return False
+        if self.max_run and re.search(r"(.)\1{%d}" % self.max_run, password, re.DOTALL):
+            return False
+        folded = self._fold(password)
+        if any(folded.startswith(prefix) for prefix in self._prefixes):
+            return False
+        return not self.matcher.search(folded)
+
+@lru_cache(maxsize=64)
+def compile_policy(policy: PasswordPolicy) -> GenerationPlan:
+    """Compile policy into a GenerationPlan (cached, so repeated calls are free)."""
+    return GenerationPlan(policy)
+
+def generate_policy_passwords(policy: PasswordPolicy, n: int = 1, max_attempts: int = 10000) -> List[str]:
+    """
+    Generate n passwords following policy, each unique within the session.
+    Raises RuntimeError if the policy keeps producing duplicates.
+    """
+    if n < 0:
+        raise ValueError("Number of passwords must not be negative.")
+    plan = compile_policy(policy)
+    record = _generated_passwords.add
+    passwords = []
+    failed = 0
+    while len(passwords) < n:
+        candidate = plan.generate()
+        if record(candidate):
+            passwords.append(candidate)
+            continue
+        failed += 1
+        if failed > max_attempts:
+            raise RuntimeError("Failed to generate a unique password following the policy after many attempts.")
+    return passwords
+
+# Passwords generated per export batch (per worker round trip)
+EXPORT_BATCH = 50_000
+
+# Write buffer of the export file
+EXPORT_BUFFER_BYTES = 1 << 20
+
+EXPORT_FORMATS = ("raw", "csv", "jsonl")
+
+def format_passwords(passwords: List[str], fmt: str) -> bytes:
+    # one record per password in the given export format, without the CSV header
+    if fmt == "raw":
+        text = "\n".join(passwords) + "\n"
+    elif fmt == "jsonl":
+        text = "".join(['{"password": %s}\n' % json.dumps(p) for p in passwords])
+    else:
+        out = io.StringIO()
+        writer = csv.writer(out, lineterminator="\n")
+        writer.writerows([p] for p in passwords)
+        text = out.getvalue()
+    return text.encode("utf-8")
+
+def partition_quotas(parts: List[str], length: int, enforce_each_category: bool,
+                     groups: List[str], count: int) -> List[int]:
+    """
+    Split `count` passwords across partitions of the password space by first
+    character, proportionally to the exact size of each partition (counted like
+    count_passwords()), so the combined output is as uniform as a single generator's.
+    """
+    alphabet = set("".join(parts))
+    sizes = [0] * len(groups)
+    left_out_options = range(len(parts) + 1) if enforce_each_category else (0,)
+    for excluded in left_out_options:
+        for left_out in combinations(parts, excluded):
+            allowed = alphabet.difference(*left_out)
+            tail = len(allowed) ** (length - 1)
+            for g, group in enumerate(groups):
+                sizes[g] += (-1) ** excluded * len(allowed.intersection(group)) * tail
+    total = sum(sizes)
+    quotas = [count * size // total for size in sizes]
+    # hand out the rounding leftovers by largest remainder
+    by_remainder = sorted(range(len(groups)), key=lambda g: count * sizes[g] % total, reverse=True)
+    for g in by_remainder[:count - sum(quotas)]:
+        quotas[g] += 1
+    return quotas
+
+def _export_worker(options: dict, first_chars: Optional[str], quota: int, fmt: str, queue) -> None:
+    # generate one partition's passwords in batches and send them, formatted, to the writer
+    try:
+        reset_session()
+        while quota > 0:
+            batch = min(quota, EXPORT_BATCH)
+            queue.put(format_passwords(generate_passwords(batch, first_chars=first_chars, **options), fmt))
+            quota -= batch
+    except (ValueError, RuntimeError) as e:
+        queue.put(str(e))
+    queue.put(None)
+
+def open_export_file(path: str):
+    # create (or truncate) path readable by the owner only, behind a large write buffer
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    os.fchmod(fd, 0o600)  # O_CREAT's mode does not apply to an existing file
+    return os.fdopen(fd, "wb", buffering=EXPORT_BUFFER_BYTES)
+
+# Seconds to wait for a worker's batch before checking that the workers are still alive
+WORKER_POLL_SECONDS = 1.0
+
+def export_passwords(out, count: int, length: int, fmt: str = "raw", jobs: int = 1,
+                     use_upper: bool = True, use_lower: bool = True, use_digits: bool = True,
+                     use_special: bool = True, enforce_each_category: bool = True,
+                     special_chars: str = DEFAULT_SPECIALS) -> None:
+    """
+    Generate `count` unique passwords and write them to `out`: a binary file, or a path
+    that is created with open_export_file() once the options have been validated.
+
+    With jobs > 1 the password space is split by first character into one disjoint
+    partition per worker process, so workers keep their own uniqueness store and never
+    produce each other's passwords. Workers send formatted batches back to this
+    process, which only writes them; a worker that dies fails the export. Small
+    password spaces, where the near-exhaustion path may be needed, are generated in
+    this process.
+    """
+    options = dict(length=length, use_upper=use_upper, use_lower=use_lower, use_digits=use_digits,
+                   use_special=use_special, enforce_each_category=enforce_each_category,
+                   special_chars=special_chars)
+    charset, parts, config, total_possible = _checked_charset(length, use_upper, use_lower, use_digits, use_special,
+                                                              enforce_each_category, special_chars)
+    if count > total_possible:
+        raise RuntimeError(f"Only {total_possible} unique passwords are possible with the chosen length and charset.")
+    alphabet = "".join(dict.fromkeys(charset))
+    jobs = min(jobs, len(alphabet))
+    if (count * EXHAUSTION_RATIO > total_possible or max(map(ord, alphabet)) > 255) and jobs > 1:
+        jobs = 1
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format '{fmt}'.")
+
+    if isinstance(out, str):
+        with open_export_file(out) as f:
+            _write_export(f, count, fmt, jobs, options, alphabet, parts)
+    else:
+        _write_export(out, count, fmt, jobs, options, alphabet, parts)
+
+def _write_export(out, count: int, fmt: str, jobs: int, options: dict, alphabet: str, parts: list) -> None:
+    # the writing half of export_passwords(), once the options are known to be valid
+    if fmt == "csv":
+        out.write(b"password\n")
+    if jobs <= 1:
+        remaining = count
+        while remaining > 0:
+            batch = min(remaining, EXPORT_BATCH)
+            out.write(format_passwords(generate_passwords(batch, **options), fmt))
+            remaining -= batch
+        return
+
+    groups = [alphabet[g::jobs] for g in range(jobs)]
+    quotas = partition_quotas(parts, options["length"], options["enforce_each_category"], groups, count)
+    results = multiprocessing.Queue(maxsize=2 * jobs)
+    workers = [multiprocessing.Process(target=_export_worker, args=(options, group, quota, fmt, results), daemon=True)
+               for group, quota in zip(groups, quotas) if quota]
+    for worker in workers:
+        worker.start()
+    try:
+        running = len(workers)
+        while running:
+            try:
+                chunk = results.get(timeout=WORKER_POLL_SECONDS)
+            except queue.Empty:
+                # a worker killed or crashed without reporting never sends its end marker
+                failed = [w.exitcode for w in workers if w.exitcode not in (None, 0)]
+                if failed:
+                    raise RuntimeError(f"A worker process failed (exit code {failed[0]}).")
+                if not any(w.is_alive() for w in workers):
+                    raise RuntimeError("Worker processes exited before finishing.")
+                continue
+            if chunk is None:
+                running -= 1
+            elif isinstance(chunk, str):
+                raise RuntimeError(chunk)
+            else:
+                out.write(chunk)
+    finally:
+        for worker in workers:
+            if worker.is_alive():
+                worker.terminate()
+            worker.join()
+
 def interactive_cli():
     print("Secure Password Generator (session-unique, uses 'secrets')\n")
 
@@ -135,20 +1034,56 @@ def interactive_cli():
         return
 
     print("\nGenerated passwords:")
-    for i in range(count):
-        try:
-            pwd = generate_password(length, use_upper, use_lower, use_digits, use_special, enforce_each, custom_special or DEFAULT_SPECIALS)
-        except Exception as e:
-            print(f"ERROR: {e}")
-            break
+    try:
+        passwords = generate_passwords(count, length, use_upper, use_lower, use_digits, use_special, enforce_each, custom_special or DEFAULT_SPECIALS)
+    except Exception as e:
+        print(f"ERROR: {e}")
+        passwords = []
+    for i, pwd in enumerate(passwords):
         print(f"{i+1}. {pwd}")
 
     print("\nNote: passwords are guaranteed unique only within this program run (session).")
 
+def main() -> int:
+    # Without arguments, start the interactive CLI
+    if len(sys.argv) == 1:
+        interactive_cli()
+        return 0
+
+    parser = argparse.ArgumentParser(description="Generate session-unique secure random passwords")
+    parser.add_argument("--count", type=int, default=1, help="Number of passwords (default: 1)")
+    parser.add_argument("--length", type=int, required=True, help="Password length")
+    parser.add_argument("--no-upper", action="store_true", help="Leave out uppercase letters")
+    parser.add_argument("--no-lower", action="store_true", help="Leave out lowercase letters")
+    parser.add_argument("--no-digits", action="store_true", help="Leave out digits")
+    parser.add_argument("--no-special", action="store_true", help="Leave out special characters")
+    parser.add_argument("--specials", default=DEFAULT_SPECIALS, help="Special characters to use")
+    parser.add_argument("--no-enforce", action="store_true",
+                        help="Do not require one character from each selected type")
+    parser.add_argument("--out", help="Write to this file, created readable by the owner only (default: stdout)")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default="raw", help="Output format (default: raw)")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                        help="Worker processes (default: number of CPUs)")
+
+    args = parser.parse_args()
+    if args.count <= 0:
+        print("Error: --count must be positive")
+        return 1
+
+    try:
+        export_passwords(args.out or sys.stdout.buffer, args.count, args.length, args.format, args.jobs,
+                         not args.no_upper, not args.no_lower, not args.no_digits, not args.no_special,
+                         not args.no_enforce, args.specials)
+    except (ValueError, RuntimeError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        sys.stdout.flush()
+    return 0
+
 if __name__ == "__main__":
-    # If script is run directly, start interactive CLI
     try:
-        interactive_cli()
+        sys.exit(main())
     except KeyboardInterrupt:
         print("\nAborted.")
         sys.exit(1)
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Password Generator Benchmark - Compare bulk and per-password generation
+
+Times generate_passwords() against calling generate_password() in a loop
+for several password lengths and charsets, and prints passwords per second
+for both paths as JSON.
+"""
+
+import sys
+import json
+import time
+import argparse
+from typing import Dict
+
+import passwordGen
+
+# name -> (use_upper, use_lower, use_digits, use_special)
+CHARSETS = {
+    "full": (True, True, True, True),
+    "alnum": (True, True, True, False),
+    "digits": (False, False, True, False),
+}
+
+
+def time_path(generate, count: int) -> float:
+    """
+    Time one generation path from an empty session
+
+    Args:
+        generate: Callable producing `count` passwords
+        count: Number of passwords, used to compute the rate
+
+    Returns:
+        Passwords per second
+    """
+    passwordGen.reset_session()
+    start = time.perf_counter()
+    generate()
+    return count / (time.perf_counter() - start)
+
+
+def bench_case(count: int, length: int, charset: str, enforce: bool) -> Dict:
+    flags = CHARSETS[charset]
+
+    def single():
+        for _ in range(count):
+            passwordGen.generate_password(length, *flags, enforce)
+
+    def bulk():
+        passwordGen.generate_passwords(count, length, *flags, enforce)
+
+    per_password = time_path(single, count)
+    batched = time_path(bulk, count)
+    seen = passwordGen._generated_passwords
+    return {
+        "length": length,
+        "charset": charset,
+        "enforce_each_category": enforce,
+        "count": count,
+        "per_password_per_sec": round(per_password),
+        "bulk_per_sec": round(batched),
+        "speedup": round(batched / per_password, 1),
+        "uniqueness_bytes_per_password": round(seen.nbytes / len(seen), 1),
+    }
+
+
+# A policy typical of identity systems, for comparing direct generation with post-filtering
+EXAMPLE_POLICY = dict(min_upper=2, min_digits=2, min_special=2, exclude_ambiguous=True, max_run=1,
+                      banned_substrings=("password", "admin", "qwerty", "letmein", "123", "abc"),
+                      forbidden_prefixes=("admin", "root"))
+
+
+def bench_policy(count: int, length: int) -> Dict:
+    """
+    Time generate_policy_passwords() against generating with generate_passwords()
+    and discarding passwords the policy rejects
+
+    Returns:
+        Rates of both paths and the share of draws the post-filter threw away
+    """
+    policy = passwordGen.PasswordPolicy(length, **EXAMPLE_POLICY)
+    plan = passwordGen.compile_policy(policy)
+    drawn = 0
+
+    def post_filter():
+        nonlocal drawn
+        kept = 0
+        while kept < count:
+            batch = passwordGen.generate_passwords(count, length)
+            drawn += len(batch)
+            kept += sum(map(plan.allows, batch))
+
+    def compiled():
+        passwordGen.generate_policy_passwords(policy, count)
+
+    filtered = time_path(post_filter, count)
+    direct = time_path(compiled, count)
+    return {
+        "length": length,
+        "count": count,
+        "post_filter_per_sec": round(filtered),
+        "post_filter_rejected": round(1 - count / drawn, 3),
+        "policy_plan_per_sec": round(direct),
+        "speedup": round(direct / filtered, 1),
+    }
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Benchmark bulk against per-password generation")
+    parser.add_argument("--count", type=int, default=20000, help="Passwords generated per case")
+    parser.add_argument("--lengths", type=int, nargs="+", default=[8, 16, 32], help="Password lengths")
+    parser.add_argument("--charsets", nargs="+", choices=sorted(CHARSETS), default=["full", "alnum"],
+                        help="Charsets to benchmark")
+    parser.add_argument("--no-enforce", action="store_true", help="Do not require one character per category")
+    parser.add_argument("--bloom", type=float, metavar="FP_RATE",
+                        help="Track uniqueness with a Bloom filter at this false-positive rate")
+    parser.add_argument("--policy", action="store_true",
+                        help="Also compare policy plans with post-filtering (uses the first length)")
+    parser.add_argument("-o", "--output", help="Write the JSON report to this file instead of stdout")
+
+    args = parser.parse_args()
+    if args.bloom:
+        passwordGen.set_uniqueness_backend(passwordGen.BloomFilter(args.count, args.bloom))
+    report = {
+        "numpy": passwordGen.np is not None,
+        "uniqueness_backend": type(passwordGen._generated_passwords).__name__,
+        "cases": [bench_case(args.count, length, charset, not args.no_enforce)
+                  for charset in args.charsets for length in args.lengths],
+    }
+    if args.policy:
+        report["policy"] = bench_policy(args.count, args.lengths[0])
+    passwordGen.reset_session()
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())